@@ -0,0 +1,35 @@
+"""Index test functions with model-written analyses.
+
+Run ``python -m testindex --help`` for the command-line interface. The
+names below can be imported from the package directly; each is loaded from
+its module on first use, and Ollama and Couchbase only when a model call is
+made or a Couchbase store is opened.
+"""
+import importlib
+
+_EXPORTS = {
+    'AnalysisCache': 'analysis_cache',
+    'BatchWriter': 'document_store',
+    'CouchbaseStore': 'document_store',
+    'JsonlStore': 'document_store',
+    'SQLiteStore': 'document_store',
+    'analyze_concurrently': 'pipeline',
+    'analyze_function': 'static_analysis',
+    'analyze_sequentially': 'pipeline',
+    'analyze_static_only': 'pipeline',
+    'annotate_document': 'analysis',
+    'connect_to_cluster': 'document_store',
+    'crawl_repository': 'extractor',
+    'extract_test_functions': 'pipeline',
+    'get_test_analysis': 'analysis',
+    'iter_test_functions': 'extractor',
+    'static_document': 'static_analysis',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
@@ -0,0 +1,482 @@
+"""Model side of the indexer: prompts, Ollama calls and turning responses into analysis documents.
+
+``ollama`` is imported on the first model call, so importing this module is cheap.
+"""
+import functools
+import json
+import time
+
+from . import metrics
+from .analysis_cache import cache_key, source_hash
+from .json_stream import JsonObjectScanner
+from .prompt_builder import chunk_function, compact_source, count_tokens, merge_analyses
+from .resilience import ModelUnavailable
+from .static_analysis import (analyze_function, is_low_confidence, static_description, static_document, static_usage,
+                              summarize)
+
+MODEL_NAME = "qwq"
+# Models whose chat template opens a <think> block, so their output only closes it
+REASONING_MODELS = ("qwq", "deepseek-r1")
+# Bump whenever the prompt template changes so cached analyses are not reused
+PROMPT_VERSION = 3
+# Functions whose compacted source is longer than this are analyzed in chunks
+PROMPT_TOKEN_BUDGET = 1500
+
+
+PROMPT_TEMPLATE = """
+You are an expert Python test analyzer with deep knowledge of testing frameworks and methodologies. Your task is to analyze the following test function and provide a detailed, accurate description of what it does.
+
+Function to analyze:
+```python
+{function_code}
+```
+
+I need you to carefully examine the code and provide:
+
+1. A precise description of what this specific test is verifying
+2. The exact sequence of steps this particular test performs, based on the actual code
+3. All function calls and dependencies (base functions)used in this specific test
+4. The purpose and usage of this test based on its implementation
+
+Your analysis must be based ONLY on the actual code provided, not on general assumptions about testing. Each step should correspond to a specific action in the code.
+
+Return your analysis in this EXACT JSON format (without the "test" wrapper):
+{{
+  "description": "Detailed description of what this specific test verifies (1-2 sentences)",
+  "steps": [
+    "Step 1: Specific action from the code",
+    "Step 2: Specific action from the code",
+    "..."
+  ],
+  "functions_dependencies": [
+    "actual_function_name1",
+    "actual_function_name2",
+    "..."
+  ],
+  "usage": "Explanation of how this specific test is used based on its implementation (1-2 sentences)"
+}}
+
+IMPORTANT REQUIREMENTS:
+1. Each step must correspond to a specific line or block of code in the function
+2. Steps must be in the exact order they appear in the code
+3. Include ALL function calls made in the test in the functions_dependencies list
+4. Be extremely specific about what the test is doing - no generic descriptions
+5. If you're unsure about a specific detail, focus on what you can determine from the code
+6. Do not include the test function itself in the dependencies list
+7. If there are no dependencies, use an empty array []
+8. Do not return generic steps - each step should be unique to this specific test
+9. Do not wrap the JSON in a "test" object - return the JSON exactly as shown above
+"""
+
+
+def build_prompt(function_code):
+    return PROMPT_TEMPLATE.format(function_code=function_code)
+
+
+BATCH_PROMPT_TEMPLATE = """
+You are an expert Python test analyzer with deep knowledge of testing frameworks and methodologies. Your task is to analyze each of the following {count} test functions separately and provide a detailed, accurate description of what each one does.
+
+{functions}
+
+For EACH function, examine its code and provide:
+
+1. A precise description of what this specific test is verifying
+2. The exact sequence of steps this particular test performs, based on the actual code
+3. All function calls and dependencies (base functions) used in this specific test
+4. The purpose and usage of this test based on its implementation
+
+Your analysis must be based ONLY on the actual code provided. Never mix up steps or dependencies between functions.
+
+Return a JSON array with exactly one object per function, in this EXACT format:
+[
+  {{
+    "function": "name of the function as given in its heading",
+    "description": "Detailed description of what this specific test verifies (1-2 sentences)",
+    "steps": ["Step 1: Specific action from the code", "Step 2: Specific action from the code", "..."],
+    "functions_dependencies": ["actual_function_name1", "actual_function_name2", "..."],
+    "usage": "Explanation of how this specific test is used based on its implementation (1-2 sentences)"
+  }}
+]
+
+IMPORTANT REQUIREMENTS:
+1. Each step must correspond to a specific line or block of code in that function, in code order
+2. Include ALL function calls made in the test in its functions_dependencies list, and [] if there are none
+3. Do not include the test function itself in its dependencies list
+4. Return only the JSON array, with no text before or after it
+"""
+
+
+def build_batch_prompt(functions):
+    """Prompt asking for one analysis per (name, code) pair, answered as a JSON array."""
+    sections = [f"### Function {i}: {name}\n```python\n{code}\n```" for i, (name, code) in enumerate(functions, 1)]
+    return BATCH_PROMPT_TEMPLATE.format(count=len(functions), functions='\n\n'.join(sections))
+
+
+def is_valid_analysis(analysis):
+    """Check a parsed response against the analysis schema."""
+    return (isinstance(analysis, dict)
+            and isinstance(analysis.get("description"), str) and analysis["description"].strip() != ''
+            and isinstance(analysis.get("steps"), list) and len(analysis["steps"]) > 0
+            and all(isinstance(step, str) for step in analysis["steps"])
+            and isinstance(analysis.get("functions_dependencies"), list)
+            and isinstance(analysis.get("usage"), str) and analysis["usage"].strip() != '')
+
+
+def parse_model_response(result):
+    """Extract the JSON object from a model response; raises json.JSONDecodeError."""
+    if "```json" in result:
+        recovery = 'json_fence'
+        json_text = result.split("```json")[1].split("```")[0].strip()
+    elif "```" in result:
+        recovery = 'plain_fence'
+        json_text = result.split("```")[1].split("```")[0].strip()
+    else:
+        recovery = 'raw'
+        json_text = result
+    with metrics.timed('json_recovery', path=recovery, chars=len(result)):
+        return json.loads(json_text)
+
+
+def parse_batch_response(result, names):
+    """Map each function name to its analysis in a batched response.
+
+    Accepts a JSON array of objects carrying a "function" key, or an object
+    keyed by function name. Entries that match no name are dropped; a name
+    may also be matched by its last dotted part. Raises json.JSONDecodeError.
+    """
+    try:
+        parsed = parse_model_response(result)
+    except json.JSONDecodeError:
+        # Models sometimes write a sentence around the array
+        start, end = result.find('['), result.rfind(']')
+        if start < 0 or end < start:
+            raise
+        parsed = json.loads(result[start:end + 1])
+    if isinstance(parsed, dict):
+        if all(isinstance(value, dict) for value in parsed.values()):
+            parsed = [dict(value, function=name) for name, value in parsed.items()]
+        else:
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), [])
+    if not isinstance(parsed, list):
+        return {}
+
+    lookup = {name: name for name in names}
+    short_names = [name.rsplit('.', 1)[-1] for name in names]
+    lookup.update({short: name for short, name in zip(short_names, names) if short_names.count(short) == 1})
+    analyses = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        name = lookup.get(str(entry.get("function") or entry.get("name") or ''))
+        analysis = entry["test"] if isinstance(entry.get("test"), dict) else entry
+        if name is not None and name not in analyses:
+            analyses[name] = analysis
+    return analyses
+
+
+def _token_counts(response):
+    """Pull Ollama's timing and token counters out of a response, where present."""
+    return {name: response.get(name) for name in ('prompt_eval_count', 'eval_count', 'total_duration')
+            if response.get(name) is not None}
+
+
+@functools.lru_cache(maxsize=None)
+def _ollama_client(timeout):
+    """Client for the default Ollama host whose requests give up after ``timeout`` seconds."""
+    import ollama
+
+    return ollama.Client(timeout=timeout)
+
+
+def call_model(model_name, prompt, router=None, timeout=None):
+    """Send the prompt and return the complete response text.
+
+    With a router the request goes to one of its backends instead of the
+    default Ollama host, under the router's own timeout.
+    """
+    if router is not None:
+        with metrics.timed('model_call', model=model_name, api='chat', prompt_chars=len(prompt)) as event:
+            response = router.chat(model_name, [{"role": "user", "content": prompt}])
+            event.update(_token_counts(response))
+        return response['message']['content']
+    client = _ollama_client(timeout)
+
+    try:
+        with metrics.timed('model_call', model=model_name, api='chat', prompt_chars=len(prompt)) as event:
+            response = client.chat(model=model_name, messages=[
+                {"role": "user", "content": prompt}
+            ])
+            event.update(_token_counts(response))
+        return response['message']['content']
+    except (AttributeError, TypeError):
+        with metrics.timed('model_call', model=model_name, api='generate', prompt_chars=len(prompt)) as event:
+            response = client.generate(model=model_name, prompt=prompt)
+            event.update(_token_counts(response))
+        return response['response']
+
+
+def stream_model_response(model_name, prompt, max_tokens=None, max_seconds=None, router=None, timeout=None):
+    """Stream a chat completion and stop as soon as the analysis JSON object is complete.
+
+    Generation is also cut off after ``max_tokens`` streamed chunks or
+    ``max_seconds`` seconds, and ``timeout`` bounds the wait for each chunk.
+    Returns the JSON object as text when one was found, otherwise whatever
+    the model produced before it finished or was stopped.
+    """
+    options = {'num_predict': max_tokens} if max_tokens else None
+    scanner = JsonObjectScanner(reasoning=model_name.split(':')[0] in REASONING_MODELS)
+    start = time.monotonic()
+    tokens = 0
+    with metrics.timed('model_call', model=model_name, api='chat_stream', prompt_chars=len(prompt)) as event:
+        messages = [{"role": "user", "content": prompt}]
+        if router is not None:
+            stream = router.chat(model_name, messages, stream=True, options=options)
+        else:
+            stream = _ollama_client(timeout).chat(model=model_name, messages=messages, stream=True, options=options)
+        event['stopped'] = 'done'
+        try:
+            for chunk in stream:
+                tokens += 1
+                # Only the final chunk carries Ollama's counters, and only if the stream runs to the end
+                event.update(_token_counts(chunk))
+                found = scanner.feed(chunk['message']['content'])
+                if found is not None:
+                    print(f"Analysis JSON complete after {tokens} tokens, stopping generation.")
+                    event['stopped'] = 'json_complete'
+                    return json.dumps(found)
+                if max_tokens and tokens >= max_tokens:
+                    print(f"Token budget of {max_tokens} exhausted, stopping generation.")
+                    event['stopped'] = 'token_budget'
+                    break
+                if max_seconds and time.monotonic() - start >= max_seconds:
+                    print(f"Time budget of {max_seconds}s exhausted, stopping generation.")
+                    event['stopped'] = 'time_budget'
+                    break
+        finally:
+            event['streamed_tokens'] = tokens
+            # Closing the generator drops the HTTP stream, which stops generation on the server
+            stream.close()
+    return scanner.text
+
+
+def _analysis_key(function_code, send_summary, compact, token_budget, router):
+    """Cache key for an analysis made with the given prompt options."""
+    if send_summary:
+        prompt_version = f"{PROMPT_VERSION}-summary"
+    elif compact:
+        prompt_version = f"{PROMPT_VERSION}-compact-{token_budget}"
+    else:
+        prompt_version = f"{PROMPT_VERSION}-raw-{token_budget}"
+    return cache_key(function_code, router.name if router is not None else MODEL_NAME, prompt_version)
+
+
+def _llm_document(function_name, parsed_json, static, model_name):
+    """Build the stored document from the model's fields, filling missing or thin ones from the static analysis."""
+    # Keep only the known fields
+    test_info = {key_name: parsed_json[key_name]
+                 for key_name in ["description", "steps", "functions_dependencies", "usage"]
+                 if key_name in parsed_json}
+
+    # Fill in missing or thin fields from the static analysis
+    filled = [key_name for key_name in ["description", "steps", "functions_dependencies", "usage"]
+              if not test_info.get(key_name) or (key_name == "steps" and len(test_info[key_name]) < 3)]
+    metrics.increment('analysis_outcome', outcome='llm_partial' if filled else 'llm')
+    if not test_info.get("functions_dependencies"):
+        test_info["functions_dependencies"] = list(static["dependencies"])
+    if not test_info.get("description"):
+        test_info["description"] = static_description(function_name, static)
+    if not test_info.get("steps") or len(test_info["steps"]) < 3:
+        test_info["steps"] = list(static["steps"])
+    if not test_info.get("usage"):
+        test_info["usage"] = static_usage(function_name, static)
+    return {
+        "test": {key_name: test_info[key_name]
+                 for key_name in ["description", "steps", "functions_dependencies", "usage"]},
+        "meta": {"analysis": "llm", "model": model_name, "confidence": "high"},
+    }
+
+
+# Function to get a detailed analysis of a test function using Ollama
+def get_test_analysis(function_name, function_code, cache=None, send_summary=False, stream=False,
+                      max_tokens=None, max_seconds=None, compact=True, token_budget=PROMPT_TOKEN_BUDGET, router=None,
+                      client=None, timeout=None, deadline=None):
+    """Analyze a test function with the model, filling gaps from the static analysis.
+
+    With ``compact`` the source is sent without comments, blank lines or runs
+    of repeated calls, and if it is still over ``token_budget`` tokens it is
+    analyzed in chunks whose results are merged. With ``send_summary`` the model
+    gets the compact static summary instead of the source. With ``stream`` the
+    response is consumed as it is generated and cut off once the JSON is
+    complete or the token/time budget runs out. With a ``router``, requests are
+    spread over its backends and output that fails schema validation is retried
+    on the next larger model. With a ResilientClient as ``client``, requests are
+    rate limited and retried, and ModelUnavailable is raised once the server
+    keeps failing or the ``time.monotonic()`` value ``deadline`` passes, so the
+    caller can defer the function. Requests to the default host are abandoned
+    after ``timeout`` seconds. Otherwise, if the model
+    fails or returns unusable output, the document is built from the static
+    analysis alone.
+    """
+    key = None
+    if cache is not None:
+        key = _analysis_key(function_code, send_summary, compact, token_budget, router)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Cache hit for {function_name}, skipping model call.")
+            metrics.increment('analysis_outcome', outcome='cache_hit')
+            return cached
+
+    static = analyze_function(function_name, function_code)
+    if send_summary:
+        prompt_code = summarize(static)
+    else:
+        prompt_code = compact_source(function_code) if compact else function_code
+        chunks = chunk_function(prompt_code, token_budget) if token_budget else [prompt_code]
+        if len(chunks) > 1:
+            return _analyze_in_chunks(function_name, chunks, cache, key, stream=stream, max_tokens=max_tokens,
+                                      max_seconds=max_seconds, router=router, client=client, timeout=timeout,
+                                      deadline=deadline)
+    try:
+        prompt = build_prompt(prompt_code)
+        print(f"Prompt ({count_tokens(prompt)} tokens): {prompt}")
+        models = router.models_for(count_tokens(prompt_code)) if router is not None else [MODEL_NAME]
+        for attempt, model_name in enumerate(models):
+            print(f"Using model: {model_name}")
+
+            if stream:
+                request = functools.partial(stream_model_response, model_name, prompt, max_tokens=max_tokens,
+                                            max_seconds=max_seconds, router=router, timeout=timeout)
+            else:
+                request = functools.partial(call_model, model_name, prompt, router=router, timeout=timeout)
+            result = client.call(request, deadline=deadline) if client is not None else request()
+            
+            # Try to parse the response as JSON
+            try:
+                parsed_json = parse_model_response(result)
+            except json.JSONDecodeError:
+                parsed_json = None
+            # Unwrap a "test" object if the model added one anyway
+            if isinstance(parsed_json, dict) and isinstance(parsed_json.get("test"), dict):
+                parsed_json = parsed_json["test"]
+            if attempt < len(models) - 1 and not is_valid_analysis(parsed_json):
+                print(f"Response from {model_name} failed schema validation, escalating to {models[attempt + 1]}.")
+                metrics.increment('model_escalations', model=model_name)
+                continue
+            break
+
+        if parsed_json is None:
+            print("Warning: Could not parse response as JSON. Creating a structured analysis.")
+            metrics.increment('analysis_outcome', outcome='json_decode_fallback')
+            return static_document(function_name, static)
+        if not isinstance(parsed_json, dict):
+            print("Warning: Response is not a JSON object. Creating a structured analysis.")
+            metrics.increment('analysis_outcome', outcome='non_object_fallback')
+            return static_document(function_name, static)
+        parsed_json = _llm_document(function_name, parsed_json, static, model_name)
+
+        # Only model output is cached; heuristic fallbacks should be retried next run
+        if cache is not None:
+            cache.put(key, parsed_json)
+        return parsed_json
+    
+    except ModelUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error with Ollama: {e}")
+        metrics.increment('analysis_outcome', outcome='exception_fallback')
+        return static_document(function_name, static)
+
+
+def _analyze_in_chunks(function_name, chunks, cache, key, **options):
+    """Analyze each chunk of an oversized function separately and merge the results."""
+    print(f"{function_name} is over the prompt token budget, analyzing it in {len(chunks)} chunks.")
+    metrics.increment('chunked_functions')
+    parts = [get_test_analysis(function_name, chunk, compact=False, token_budget=None, **options) for chunk in chunks]
+    all_llm = all(not is_low_confidence(part) for part in parts)
+    document = {
+        "test": merge_analyses(parts),
+        "meta": parts[0]["meta"] if all_llm else {"analysis": "static", "confidence": "low"},
+    }
+    document["meta"] = dict(document["meta"], chunks=len(chunks))
+    if cache is not None and all_llm:
+        cache.put(key, document)
+    return document
+
+
+def analyze_batch(functions, cache=None, send_summary=False, stream=False, max_tokens=None, max_seconds=None,
+                  compact=True, token_budget=PROMPT_TOKEN_BUDGET, router=None, client=None, timeout=None,
+                  deadline=None):
+    """Analyze several small test functions with one model request; return {name: document}.
+
+    Cached analyses are used as they are. Functions whose entry is missing from
+    the response or fails schema validation are analyzed again one at a time
+    with get_test_analysis. The batch request is never streamed, since the
+    streaming scanner stops at the first complete object. ModelUnavailable
+    propagates so the caller can defer the whole batch.
+    """
+    options = dict(send_summary=send_summary, stream=stream, max_tokens=max_tokens, max_seconds=max_seconds,
+                   compact=compact, token_budget=token_budget, router=router, client=client, timeout=timeout,
+                   deadline=deadline)
+    documents = {}
+    remaining = []
+    for name, code in functions:
+        key = _analysis_key(code, send_summary, compact, token_budget, router) if cache is not None else None
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            metrics.increment('analysis_outcome', outcome='cache_hit')
+            documents[name] = cached
+        else:
+            remaining.append((name, code, key))
+    if len(remaining) == 1:
+        name, code, _ = remaining[0]
+        documents[name] = get_test_analysis(name, code, cache=cache, **options)
+        remaining = []
+    if not remaining:
+        return documents
+
+    statics = {name: analyze_function(name, code) for name, code, _ in remaining}
+    prompt_functions = [(name, summarize(statics[name]) if send_summary else compact_source(code) if compact else code)
+                        for name, code, _ in remaining]
+    prompt = build_batch_prompt(prompt_functions)
+    code_tokens = sum(count_tokens(code) for _, code in prompt_functions)
+    model_name = router.models_for(code_tokens)[-1] if router is not None else MODEL_NAME
+    print(f"Analyzing {len(remaining)} functions in one request ({count_tokens(prompt)} tokens) with {model_name}")
+    request = functools.partial(call_model, model_name, prompt, router=router, timeout=timeout)
+    try:
+        with metrics.timed('batch_analysis', functions=len(remaining)):
+            result = client.call(request, deadline=deadline) if client is not None else request()
+        analyses = parse_batch_response(result, [name for name, _, _ in remaining])
+    except ModelUnavailable:
+        raise
+    except Exception as e:
+        print(f"Batched analysis failed, analyzing the functions one at a time: {e}")
+        analyses = {}
+
+    for name, code, key in remaining:
+        analysis = analyses.get(name)
+        if is_valid_analysis(analysis):
+            document = _llm_document(name, analysis, statics[name], model_name)
+            document["meta"]["batched"] = len(remaining)
+            if key is not None:
+                cache.put(key, document)
+            documents[name] = document
+        else:
+            print(f"No usable analysis for {name} in the batched response, analyzing it on its own.")
+            metrics.increment('batch_fallbacks')
+            documents[name] = get_test_analysis(name, code, cache=cache, **options)
+    return documents
+
+
+def annotate_document(document, func_code, file_path=None):
+    """Return a copy of the document with the test's source hash and file path in its meta block."""
+    meta = dict(document.get("meta", {}), source_hash=source_hash(func_code))
+    if file_path is not None:
+        meta["file_path"] = file_path
+    return dict(document, meta=meta)
+
+
+def unavailable_fallback(func_name, func_code):
+    """Static document for a function the model could not analyze in any of the deferred retry rounds."""
+    print(f"Model still unavailable for {func_name}, storing its static analysis.")
+    metrics.increment('analysis_outcome', outcome='unavailable_fallback')
+    return static_document(func_name, analyze_function(func_name, func_code))
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import sqlite3
+import textwrap
+import threading
+import time
+
+
+def normalize_source(function_code):
+    """Normalize function source so formatting-only edits map to the same cache key."""
+    code = textwrap.dedent(function_code.replace('\r\n', '\n').replace('\t', '    '))
+    lines = [line.rstrip() for line in code.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+def source_hash(function_code):
+    """Hash of the normalized source, stored with each document to detect changed tests."""
+    return hashlib.sha256(normalize_source(function_code).encode('utf-8')).hexdigest()
+
+
+def cache_key(function_code, model_name, prompt_version):
+    """Hash the normalized source together with the model and prompt template version."""
+    digest = hashlib.sha256()
+    for part in (model_name, str(prompt_version), normalize_source(function_code)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Persistent SQLite cache of analysis documents with size-bounded LRU eviction."""
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Shared between the worker threads of the concurrent pipeline, guarded by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " key TEXT PRIMARY KEY,"
+            " document TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached document for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT document FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, document):
+        """Store a document and evict the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, document, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(document), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM analyses WHERE key IN ("
+                " SELECT key FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
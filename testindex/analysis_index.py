@@ -0,0 +1,144 @@
+"""Local index of stored analyses: which tests call a function, and full-text search.
+
+Query it from the command line:
+    python -m testindex query INDEX calls rebalance_reached validate_partition_distribution
+    python -m testindex query INDEX search "swap rebalance"
+    python -m testindex query INDEX rebuild STORE
+"""
+import sqlite3
+import threading
+
+
+def dependency_keys(dependency):
+    """Names a dependency is indexed under: as written and without its qualifier, e.g. ``RestHelper.x`` and ``x``."""
+    name = dependency.strip()
+    if name.endswith('()'):
+        name = name[:-2]
+    return {name, name.rsplit('.', 1)[-1]} - {''}
+
+
+class AnalysisIndex:
+    """SQLite inverted index from dependency name to test ids, plus full text over descriptions and steps.
+
+    Full-text search uses FTS5 when the SQLite build has it and falls back to
+    LIKE matching otherwise. Updates are committed every ``commit_every``
+    documents and on close.
+    """
+
+    def __init__(self, path, commit_every=100):
+        self.path = path
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tests (
+                id TEXT PRIMARY KEY, description TEXT, steps TEXT, file_path TEXT
+            );
+            CREATE TABLE IF NOT EXISTS dependencies (
+                dependency TEXT NOT NULL, test_id TEXT NOT NULL, PRIMARY KEY (dependency, test_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS dependencies_test_id ON dependencies (test_id);
+        """)
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS tests_fts USING fts5(id UNINDEXED, description, steps)")
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.full_text = False
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tests").fetchone()[0]
+
+    def _delete(self, doc_id):
+        self._conn.execute("DELETE FROM tests WHERE id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM dependencies WHERE test_id = ?", (doc_id,))
+        if self.full_text:
+            self._conn.execute("DELETE FROM tests_fts WHERE id = ?", (doc_id,))
+
+    def _commit_if_due(self, count):
+        self._uncommitted += count
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def update(self, doc_id, document):
+        """Index one document, replacing whatever was indexed under its id."""
+        test = document.get("test", {})
+        steps = '\n'.join(str(step) for step in test.get("steps", []))
+        keys = {key for dependency in test.get("functions_dependencies", []) if isinstance(dependency, str)
+                for key in dependency_keys(dependency)}
+        with self._lock:
+            self._delete(doc_id)
+            self._conn.execute("INSERT INTO tests (id, description, steps, file_path) VALUES (?, ?, ?, ?)",
+                               (doc_id, test.get("description", ""), steps, document.get("meta", {}).get("file_path")))
+            self._conn.executemany("INSERT INTO dependencies (dependency, test_id) VALUES (?, ?)",
+                                   [(key, doc_id) for key in keys])
+            if self.full_text:
+                self._conn.execute("INSERT INTO tests_fts (id, description, steps) VALUES (?, ?, ?)",
+                                   (doc_id, test.get("description", ""), steps))
+            self._commit_if_due(1)
+
+    def on_result(self, doc_id, document, error):
+        """BatchWriter callback: index a document once it has been stored."""
+        if error is None:
+            self.update(doc_id, document)
+
+    def remove_many(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._delete(doc_id)
+            self._commit_if_due(len(doc_ids))
+
+    def rebuild(self, documents):
+        """Replace the index contents with an iterable of (doc_id, document) pairs."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tests")
+            self._conn.execute("DELETE FROM dependencies")
+            if self.full_text:
+                self._conn.execute("DELETE FROM tests_fts")
+        count = 0
+        for doc_id, document in documents:
+            self.update(doc_id, document)
+            count += 1
+        self.commit()
+        return count
+
+    def tests_calling(self, dependencies):
+        """Return the sorted ids of tests that depend on any of the given functions."""
+        keys = sorted({key for dependency in dependencies for key in dependency_keys(dependency)})
+        if not keys:
+            return []
+        placeholders = ', '.join('?' for _ in keys)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT test_id FROM dependencies WHERE dependency IN ({placeholders})"
+                                      " ORDER BY test_id", keys).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, query, limit=20):
+        """Return up to ``limit`` (id, description) pairs whose description or steps match every query word."""
+        words = query.split()
+        if not words:
+            return []
+        with self._lock:
+            if self.full_text:
+                match = ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+                return self._conn.execute("SELECT id, description FROM tests_fts WHERE tests_fts MATCH ?"
+                                          " ORDER BY rank LIMIT ?", (match, limit)).fetchall()
+            conditions = ' AND '.join("(description LIKE ? OR steps LIKE ?)" for _ in words)
+            params = [pattern for word in words for pattern in (f"%{word}%",) * 2]
+            return self._conn.execute(f"SELECT id, description FROM tests WHERE {conditions} ORDER BY id LIMIT ?",
+                                      params + [limit]).fetchall()
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._conn.close()
+
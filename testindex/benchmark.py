@@ -0,0 +1,199 @@
+"""Benchmark the extraction, analysis and storage stages on synthetic test modules.
+
+Analysis runs against a local stub Ollama server, so only the request
+round-trip and the static fallback paths are measured, not model inference.
+Results are printed and written as JSON so runs can be compared across commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CALLS = [
+    'load_data', 'create_fts_indexes_all_buckets', 'wait_for_indexing_complete', 'validate_index_count',
+    'deploy_all_handlers', 'verify_all_handler', 'undeploy_delete_all_functions', 'sleep',
+    'get_nodes_from_services_map', 'verify_doc_count_collections', 'create_save_handlers',
+]
+
+
+def generate_test_function(name, rng):
+    """Return the source of a synthetic test shaped like the ones in test_file.py."""
+    lines = [f"def {name}(self):",
+             "        RestConnection(self.master).modify_memory_quota(kv_quota=800, fts_quota=2000)"]
+    for _ in range(rng.randint(3, 25)):
+        kind = rng.random()
+        call = rng.choice(CALLS)
+        if kind < 0.15:
+            lines.append(f"        # {call.replace('_', ' ')}")
+        if kind < 0.3:
+            lines.append("        for index in self._cb_cluster.get_indexes():")
+            lines.append(f"            self.{call}(index)")
+        elif kind < 0.45:
+            lines.append("        reached = RestHelper(self.rest).rebalance_reached(retry_count=150)")
+            lines.append('        self.assertTrue(reached, "rebalance failed, stuck or did not complete")')
+        else:
+            lines.append(f"        self.{call}(self.docs_per_day * self.num_docs)")
+    return '\n'.join(lines) + '\n'
+
+
+def generate_module(path, num_tests, seed=0):
+    """Write a synthetic test module with num_tests tests and a helper between each pair."""
+    rng = random.Random(seed)
+    with open(path, 'w') as module:
+        for i in range(num_tests):
+            module.write(generate_test_function(f"test_synthetic_{i}", rng))
+            module.write(f"\ndef helper_{i}(value):\n    return value * {i}\n\n")
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answer /api/chat with a fixed reply: non-JSON text, or an HTTP 500 in error mode."""
+
+    mode = 'invalid'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.mode == 'error':
+            body = json.dumps({"error": "model overloaded"}).encode()
+            self.send_response(500)
+        else:
+            body = json.dumps({
+                "model": "qwq", "created_at": "2024-01-01T00:00:00Z", "done": True,
+                "message": {"role": "assistant", "content": "I could not produce JSON for this test."},
+            }).encode()
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """Start the stub Ollama server on a free port and return it."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, items=None):
+    """Throughput and latency percentiles (milliseconds) for a list of per-call latencies in seconds."""
+    total = sum(latencies)
+    items = len(latencies) if items is None else items
+    return {
+        "calls": len(latencies),
+        "items": items,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(items / total, 2) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _write_batch(writer, batch):
+    for doc_id, document in batch:
+        writer.add(doc_id, document)
+    writer.flush()
+
+
+def bench_size(api, num_tests, workdir, analysis_samples, batch_size, extract_repeats=5):
+    """Time each stage on a synthetic module of num_tests tests and return their summaries."""
+    path = os.path.join(workdir, f"test_synthetic_{num_tests}.py")
+    generate_module(path, num_tests)
+    results = {"num_tests": num_tests, "module_bytes": os.path.getsize(path)}
+
+    latencies = []
+    for _ in range(extract_repeats):
+        elapsed, functions = _timed(api.extract_test_functions, path, root=workdir)
+        latencies.append(elapsed)
+    results["extract"] = summarize(latencies, items=len(functions) * extract_repeats)
+
+    sample = list(functions.items())[:analysis_samples]
+    for mode in ('invalid', 'error'):
+        _StubOllamaHandler.mode = mode
+        # Untimed warm-up, so the lazy ollama import and client setup are not in the percentiles
+        if sample:
+            _timed(api.get_test_analysis, *sample[0])
+        latencies = [_timed(api.get_test_analysis, name, code)[0] for name, code in sample]
+        results[f"analysis_{mode}_response"] = summarize(latencies)
+
+    documents = {name: api.annotate_document(
+        api.static_document(name, api.analyze_function(name, code)), code) for name, code in functions.items()}
+    store = api.SQLiteStore(os.path.join(workdir, f"store_{num_tests}.sqlite"))
+    writer = api.BatchWriter(store, batch_size=batch_size, flush_interval=float('inf'))
+    latencies = []
+    items = list(documents.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        latencies.append(_timed(_write_batch, writer, batch)[0])
+    results["store_batches"] = summarize(latencies, items=len(items))
+    store.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help="Tests per synthetic module")
+    parser.add_argument('--analysis-samples', type=int, default=50,
+                        help="Functions per size sent through get_test_analysis")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--extract-repeats', type=int, default=5, help="Timed extraction runs per size")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    # The ollama module reads OLLAMA_HOST when it is imported, so point it at the stub first
+    os.environ['OLLAMA_HOST'] = f"http://127.0.0.1:{server.server_address[1]}"
+    import testindex as api
+
+    report = {"revision": git_revision(), "timestamp": time.time(), "sizes": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results = bench_size(api, size, workdir, args.analysis_samples, args.batch_size, args.extract_repeats)
+            report["sizes"].append(results)
+            print(f"{size} tests:")
+            for stage, stats in results.items():
+                if isinstance(stats, dict):
+                    print(f"  {stage:28} {stats['throughput_per_s']:>10} items/s  "
+                          f"p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms")
+    server.shutdown()
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
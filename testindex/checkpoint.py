@@ -0,0 +1,99 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .analysis_cache import source_hash
+
+
+def parse_shard(value):
+    """Parse a shard spec such as ``2/4`` into a zero-based ``(index, count)`` pair.
+
+    Used as an argparse ``type``, so errors are ArgumentTypeError and their message is shown.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/n, got {value!r}")
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"shard count must be at least 1, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {value!r}")
+    return index - 1, count
+
+
+def in_shard(func_name, index, count):
+    """Assign a function to a shard by a stable hash of its name, the same on every machine."""
+    digest = hashlib.sha1(func_name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count == index
+
+
+def shard_journal_path(path, index, count):
+    """Journal file for one shard, e.g. ``checkpoint.jsonl`` becomes ``checkpoint.2-of-4.jsonl``."""
+    if count == 1:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{index + 1}-of-{count}{ext}"
+
+
+class Checkpoint:
+    """Append-only journal of the test functions whose documents have been stored.
+
+    Each line records a function, the hash of the source that was analyzed and
+    the id of the stored document. A function counts as done only while its
+    source hash still matches, so edited tests are analyzed again. A line cut
+    short by a crash is ignored when the journal is loaded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        self.skipped = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                        self.completed[entry["function"]] = entry["source_hash"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self._file = open(path, 'a')
+        if self._file.tell() > 0:
+            with open(path, 'rb') as journal:
+                journal.seek(-1, os.SEEK_END)
+                if journal.read(1) != b'\n':
+                    # Start after the partial line a crash left behind
+                    self._file.write('\n')
+        print(f"Checkpoint {path}: {len(self.completed)} functions already done.")
+
+    def is_done(self, func_name, func_code):
+        return self.completed.get(func_name) == source_hash(func_code)
+
+    def record(self, func_name, hash_value, doc_id):
+        with self._lock:
+            self.completed[func_name] = hash_value
+            self._file.write(json.dumps({"function": func_name, "source_hash": hash_value, "doc_id": doc_id,
+                                         "ts": round(time.time(), 3)}) + '\n')
+            self._file.flush()
+
+    def on_result(self, doc_id, document, error):
+        """BatchWriter callback: journal a document once it has been written successfully."""
+        if error is None:
+            self.record(doc_id, document.get("meta", {}).get("source_hash"), doc_id)
+
+    def pending(self, test_functions, shard=None):
+        """Yield the (name, source) pairs still to do, restricted to ``shard`` = (index, count) if given."""
+        for func_name, func_code in test_functions:
+            if shard is not None and not in_shard(func_name, *shard):
+                continue
+            if self.is_done(func_name, func_code):
+                self.skipped += 1
+                continue
+            yield func_name, func_code
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,422 @@
+"""Command-line interface: ``python -m testindex {extract,analyze,store,convert,query}``.
+
+Each command imports only the stages it runs, so ``extract`` and ``convert``
+start without loading the Ollama or Couchbase clients.
+"""
+import argparse
+import json
+import os
+import sys
+
+from .analysis import MODEL_NAME, PROMPT_TOKEN_BUDGET
+from .checkpoint import parse_shard
+from .dedup import DEFAULT_THRESHOLD
+
+
+def _add_store_options(parser):
+    parser.add_argument('--cluster', default=os.environ.get('TESTINDEX_CLUSTER'),
+                        help="Couchbase cluster address (default: $TESTINDEX_CLUSTER)")
+    parser.add_argument('--username', default=os.environ.get('TESTINDEX_USERNAME'),
+                        help="Couchbase user (default: $TESTINDEX_USERNAME)")
+    parser.add_argument('--password', default=os.environ.get('TESTINDEX_PASSWORD'),
+                        help="Couchbase password (default: $TESTINDEX_PASSWORD)")
+    parser.add_argument('--bucket', default=os.environ.get('TESTINDEX_BUCKET'),
+                        help="Couchbase bucket (default: $TESTINDEX_BUCKET)")
+    parser.add_argument('--local-store', metavar='PATH',
+                        help="Write to a local SQLite store instead of Couchbase")
+    parser.add_argument('--batch-size', type=int, default=50, help="Documents per bulk upsert")
+    parser.add_argument('--flush-interval', type=float, default=5.0,
+                        help="Seconds a partial batch may wait before it is written")
+    parser.add_argument('--index', metavar='PATH',
+                        help="Keep a local dependency and full-text index of stored analyses up to date "
+                             "(search it with the query command)")
+    parser.add_argument('--create-indexes', action='store_true',
+                        help="Create the Couchbase GSI indexes for file and dependency lookups")
+
+
+def _open_store(args):
+    """Return the store selected by the command-line options, or None if Couchbase is unreachable or not configured."""
+    from .document_store import CouchbaseStore, JsonlStore, SQLiteStore, connect_to_cluster
+
+    if getattr(args, 'output', None):
+        return JsonlStore(args.output)
+    if args.local_store:
+        return SQLiteStore(args.local_store)
+    missing = [f"--{option} or $TESTINDEX_{option.upper()}" for option in ('cluster', 'username', 'password', 'bucket')
+               if not getattr(args, option)]
+    if missing:
+        print(f"Couchbase connection not configured; set {', '.join(missing)}, "
+              "or use --local-store or --output.", file=sys.stderr)
+        return None
+    cluster = connect_to_cluster(args.cluster, args.username, args.password)
+    return CouchbaseStore(cluster, args.bucket) if cluster else None
+
+
+def _open_index(args, store):
+    """Open the --index file, filling a new one from what is already stored."""
+    if not args.index:
+        return None
+    from .analysis_index import AnalysisIndex
+
+    index = AnalysisIndex(args.index)
+    if len(index) == 0:
+        print(f"Indexed {index.rebuild(store.iter_documents())} stored documents in {args.index}.")
+    return index
+
+
+def cmd_extract(args):
+    """Write one JSON line per test function: name, file, line range and source."""
+    from .checkpoint import in_shard
+    from .extractor import crawl_repository, document_id, iter_test_functions, module_name
+
+    records = crawl_repository(args.path, processes=args.processes) if args.crawl else iter_test_functions(args.path)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    count = 0
+    try:
+        for record in records:
+            doc_id = document_id(record["file_path"], record["qualname"], args.root)
+            if args.shard and not in_shard(doc_id, *args.shard):
+                continue
+            output.write(json.dumps({
+                "id": doc_id,
+                "module": module_name(record["file_path"], args.root),
+                "class_name": record["class_name"],
+                "name": record["name"],
+                "file_path": os.path.relpath(record["file_path"], args.root),
+                "lineno": record["lineno"],
+                "end_lineno": record["end_lineno"],
+                "source": record["source"],
+            }) + '\n')
+            count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Extracted {count} test functions.", file=sys.stderr)
+    return 0
+
+
+def cmd_analyze(args):
+    """Extract, analyze and store test functions; the pipeline formerly run by script.py."""
+    from . import metrics
+    from .analysis_cache import AnalysisCache
+    from .checkpoint import Checkpoint, in_shard, shard_journal_path
+    from .dedup import cluster_functions
+    from .incremental import changed_files, plan_incremental, remove_stale
+    from .model_router import ModelRouter
+    from .pipeline import (_chain_results, _items, analyze_concurrently, analyze_sequentially, analyze_static_only,
+                           crawl_test_functions, extract_test_functions, select_for_enrichment,
+                           store_derived_variants)
+    from .resilience import AdaptiveLimiter, CircuitBreaker, ResilientClient
+
+    metrics.configure(args.metrics_jsonl)
+    store = _open_store(args)
+    if not store:
+        metrics.close()
+        return 1
+    router = None
+    if args.ollama_hosts:
+        router = ModelRouter(args.ollama_hosts, args.models, short_prompt_tokens=args.short_prompt_tokens,
+                             timeout=args.task_timeout)
+        router.start_health_checks()
+    client = ResilientClient(
+        limiter=AdaptiveLimiter(initial=args.workers, target_latency=args.target_latency),
+        breaker=CircuitBreaker(failure_threshold=args.breaker_threshold, reset_timeout=args.breaker_reset),
+        max_retries=args.max_retries, base_delay=args.retry_base_delay,
+    )
+    analysis_options = {'send_summary': args.send_summary, 'stream': args.stream, 'router': router, 'client': client,
+                        'max_tokens': args.max_tokens, 'max_seconds': args.max_seconds, 'timeout': args.task_timeout,
+                        'compact': not args.no_compact, 'token_budget': args.token_budget or None}
+    prompt_batch = (args.prompt_batch_tokens, args.prompt_batch_max) if args.prompt_batch_tokens else None
+    use_cache = not args.no_cache and not args.static_only
+    cache = AnalysisCache(args.cache, max_entries=args.cache_max_entries) if use_cache else None
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = Checkpoint(shard_journal_path(args.checkpoint, *args.shard) if args.shard else args.checkpoint)
+    index = _open_index(args, store)
+    on_result = _chain_results(checkpoint.on_result if checkpoint is not None else None,
+                               index.on_result if index is not None else None)
+
+    if args.create_indexes and hasattr(store, 'create_indexes'):
+        store.create_indexes()
+    stale_ids = []
+    if args.since or args.files:
+        files = changed_files(args.since, args.root) if args.since else args.files
+        test_functions, file_paths, stale_ids = plan_incremental(store, files, args.root)
+    elif args.crawl:
+        file_paths = {}
+        test_functions = crawl_test_functions(args.path, file_paths, processes=args.processes, root=args.root)
+    else:
+        file_paths = {}
+        test_functions = extract_test_functions(args.path, file_paths, root=args.root)
+    if checkpoint is not None or args.shard:
+        if checkpoint is not None:
+            remaining = checkpoint.pending(_items(test_functions), args.shard)
+        else:
+            remaining = ((name, code) for name, code in _items(test_functions) if in_shard(name, *args.shard))
+        test_functions = dict(remaining) if isinstance(test_functions, dict) else remaining
+    if args.enrich:
+        test_functions = select_for_enrichment(store, test_functions)
+    clusters = []
+    if args.dedup and not args.static_only:
+        all_functions = dict(_items(test_functions))
+        clusters = cluster_functions(all_functions, threshold=args.dedup_threshold)
+        test_functions = {cluster[0]: all_functions[cluster[0]] for cluster in clusters}
+        print(f"{len(all_functions)} tests form {len(clusters)} clusters of near-duplicates.")
+
+    if isinstance(test_functions, dict) and not test_functions:
+        print("No test functions to process.")
+    elif args.static_only:
+        analyze_static_only(store, test_functions, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                            file_paths=file_paths, on_result=on_result)
+    elif args.workers > 1:
+        analyze_concurrently(store, test_functions, max_workers=args.workers, task_timeout=args.task_timeout,
+                             cache=cache, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                             file_paths=file_paths, analysis_options=analysis_options, on_result=on_result,
+                             deferred_rounds=args.deferred_rounds, deferred_delay=args.breaker_reset,
+                             prompt_batch=prompt_batch)
+    else:
+        analyze_sequentially(store, test_functions, cache=cache, batch_size=args.batch_size,
+                             flush_interval=args.flush_interval, file_paths=file_paths,
+                             analysis_options=analysis_options, on_result=on_result,
+                             deferred_rounds=args.deferred_rounds, deferred_delay=args.breaker_reset,
+                             prompt_batch=prompt_batch)
+    if clusters:
+        store_derived_variants(store, clusters, all_functions, batch_size=args.batch_size,
+                               flush_interval=args.flush_interval, file_paths=file_paths, on_result=on_result)
+    remove_stale(store, stale_ids)
+    if index is not None:
+        index.remove_many(stale_ids)
+
+    print("\nProcessing complete.")
+    if cache is not None:
+        print(f"Analysis cache: {cache.hits} hits, {cache.misses} misses.")
+    if checkpoint is not None:
+        print(f"Checkpoint: skipped {checkpoint.skipped} functions completed by an earlier run.")
+    if cache is not None:
+        cache.close()
+    if checkpoint is not None:
+        checkpoint.close()
+    if index is not None:
+        index.close()
+    if hasattr(store, 'close'):
+        store.close()
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+    metrics.close()
+    return 0
+
+
+def cmd_store(args):
+    """Load documents written by ``analyze --output`` into a store."""
+    from .document_store import BatchWriter, read_jsonl_documents
+
+    store = _open_store(args)
+    if not store:
+        return 1
+    if args.create_indexes and hasattr(store, 'create_indexes'):
+        store.create_indexes()
+    index = _open_index(args, store)
+    writer = BatchWriter(store, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                         on_result=index.on_result if index is not None else None)
+    removed = []
+    for doc_id, document in read_jsonl_documents(args.input):
+        if document is None:
+            removed.append(doc_id)
+        else:
+            writer.add(doc_id, document)
+    writer.close()
+    if removed:
+        from .incremental import remove_stale
+
+        remove_stale(store, removed)
+        if index is not None:
+            index.remove_many(removed)
+    if index is not None:
+        index.close()
+    if hasattr(store, 'close'):
+        store.close()
+    print(f"Stored {writer.stored} documents, {writer.failed} failed, {len(removed)} removed.")
+    return 0 if writer.failed == 0 else 1
+
+
+def cmd_convert(args):
+    """Convert between XML and YAML; with no input, run the interactive menu."""
+    from . import converter
+
+    if args.input is None:
+        converter.interactive_menu()
+        return 0
+    if os.path.isdir(args.input):
+        if args.to is None:
+            print("Converting a directory needs --to yaml or --to xml.", file=sys.stderr)
+            return 2
+        conversion_type = 'xml_to_yaml' if args.to == 'yaml' else 'yaml_to_xml'
+        if args.flat:
+            converted = converter.process_directory(args.input, conversion_type)
+            print(f"Converted {len(converted)} files.")
+        else:
+            converter.convert_tree(args.input, conversion_type, processes=args.processes, force=args.force)
+        return 0
+    if args.input.endswith('.xml'):
+        output_file = converter.xml_to_yaml(args.input)
+    elif args.input.endswith('.yaml'):
+        output_file = converter.yaml_to_xml(args.input)
+    else:
+        print("Invalid file extension. Please provide a .xml or .yaml file.", file=sys.stderr)
+        return 2
+    if output_file is None:
+        return 1
+    print(f"Converted {args.input} to {output_file}")
+    return 0
+
+
+def cmd_query(args):
+    """Look up tests by dependency or description in a local index."""
+    import time
+
+    from .analysis_index import AnalysisIndex
+
+    index = AnalysisIndex(args.index)
+    start = time.perf_counter()
+    if args.query_command == 'calls':
+        results = index.tests_calling(args.functions)
+        lines = results
+    elif args.query_command == 'search':
+        results = [{"id": doc_id, "description": description}
+                   for doc_id, description in index.search(args.text, limit=args.limit)]
+        lines = [f"{result['id']}\t{result['description']}" for result in results]
+    else:
+        from .document_store import SQLiteStore
+
+        store = SQLiteStore(args.store)
+        count = index.rebuild(store.iter_documents())
+        store.close()
+        results, lines = {"indexed": count}, [f"Indexed {count} documents."]
+    elapsed = time.perf_counter() - start
+    index.close()
+
+    print(json.dumps(results, indent=2) if args.json else '\n'.join(lines))
+    print(f"({elapsed * 1000:.3f} ms)", file=sys.stderr)
+    return 0
+
+
+def _add_analyze_options(parser):
+    parser.add_argument('path', nargs='?', default='test_file.py', help="Test file or directory to analyze")
+    _add_store_options(parser)
+    parser.add_argument('--output', metavar='PATH',
+                        help="Append the documents to a JSON lines file instead of a store (load it with store)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of concurrent Ollama requests; 1 keeps the sequential loop")
+    parser.add_argument('--task-timeout', type=float, default=600,
+                        help="Seconds allowed per model request, and per analysis in concurrent mode")
+    parser.add_argument('--cache', default='analysis_cache.sqlite', metavar='PATH', help="Analysis cache file")
+    parser.add_argument('--no-cache', action='store_true', help="Always call the model")
+    parser.add_argument('--cache-max-entries', type=int, default=100000)
+    parser.add_argument('--send-summary', action='store_true',
+                        help="Send the model a static summary of each test instead of its source")
+    parser.add_argument('--ollama-hosts', nargs='+', metavar='URL',
+                        help="Spread requests over these Ollama servers instead of the default host")
+    parser.add_argument('--models', nargs='+', default=[MODEL_NAME], metavar='MODEL',
+                        help="Models to use with --ollama-hosts, smallest first; invalid output escalates "
+                             "to the next one")
+    parser.add_argument('--short-prompt-tokens', type=int, default=400,
+                        help="Functions of up to this many code tokens start at the smallest model")
+    parser.add_argument('--max-retries', type=int, default=4,
+                        help="Retries per model request, with jittered exponential backoff")
+    parser.add_argument('--retry-base-delay', type=float, default=1.0, help="Backoff before the first retry (seconds)")
+    parser.add_argument('--breaker-threshold', type=int, default=5,
+                        help="Consecutive model failures that open the circuit breaker")
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                        help="Seconds the breaker stays open; also the wait before deferred functions are retried")
+    parser.add_argument('--deferred-rounds', type=int, default=2,
+                        help="Times functions deferred while the model was unavailable are retried "
+                             "before they get a static analysis")
+    parser.add_argument('--target-latency', type=float,
+                        help="Lower concurrency when a model request takes longer than this many seconds")
+    parser.add_argument('--no-compact', action='store_true',
+                        help="Send test source as-is instead of stripping comments and collapsing repeated lines")
+    parser.add_argument('--token-budget', type=int, default=PROMPT_TOKEN_BUDGET,
+                        help="Analyze functions longer than this many tokens in chunks (0 disables chunking)")
+    parser.add_argument('--prompt-batch-tokens', type=int, default=0,
+                        help="Pack small tests into shared prompts of up to this many code tokens (0 disables)")
+    parser.add_argument('--prompt-batch-max', type=int, default=8, help="Most tests in one shared prompt")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream responses and stop generation as soon as the analysis JSON is complete")
+    parser.add_argument('--max-tokens', type=int, help="Token budget per streamed analysis")
+    parser.add_argument('--max-seconds', type=float, help="Time budget in seconds per streamed analysis")
+    parser.add_argument('--metrics-jsonl', metavar='PATH', help="Append one JSON line per timed event to PATH")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="Write stage timings and counters to PATH in Prometheus text format at the end")
+    parser.add_argument('--root', default='.',
+                        help="Repository root; stored file paths and --since/--files are relative to it")
+    changes = parser.add_mutually_exclusive_group()
+    changes.add_argument('--since', metavar='REV',
+                         help="Only re-index tests changed in this git revision or range (e.g. HEAD~1 or A..B)")
+    changes.add_argument('--files', nargs='+', metavar='FILE',
+                         help="Only re-index tests in these files")
+    changes.add_argument('--crawl', action='store_true',
+                         help="Treat path as a repository and extract test modules in parallel while analyzing")
+    parser.add_argument('--processes', type=int, help="Extraction processes for --crawl (default: CPU count)")
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help="Journal of stored functions; a restarted run skips the ones whose source is unchanged")
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help="Process only the I-th of N shards of the functions; the journal gets a per-shard name")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Send one test per cluster of near-duplicates to the model and derive the rest")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated similarity for two tests to share an analysis")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--static-only', action='store_true',
+                      help="Build documents from static analysis only, without a model server")
+    mode.add_argument('--enrich', action='store_true',
+                      help="Only run the model on tests that are missing or have static-only documents")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='testindex', description="Index test functions with model-written analyses.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    extract = commands.add_parser('extract', help="List test functions as JSON lines, without analyzing them")
+    extract.add_argument('path', help="Test file or directory")
+    extract.add_argument('--output', metavar='PATH', help="Write to PATH instead of standard output")
+    extract.add_argument('--crawl', action='store_true', help="Extract test modules on a process pool")
+    extract.add_argument('--processes', type=int, help="Extraction processes for --crawl (default: CPU count)")
+    extract.add_argument('--shard', type=parse_shard, metavar='I/N', help="Only list the I-th of N shards")
+    extract.add_argument('--root', default='.', help="File paths are written relative to this directory")
+    extract.set_defaults(func=cmd_extract)
+
+    analyze = commands.add_parser('analyze', help="Analyze test functions and store the analyses")
+    _add_analyze_options(analyze)
+    analyze.set_defaults(func=cmd_analyze)
+
+    store = commands.add_parser('store', help="Load documents written by analyze --output into a store")
+    store.add_argument('input', help="JSON lines file written by analyze --output")
+    _add_store_options(store)
+    store.set_defaults(func=cmd_store)
+
+    convert = commands.add_parser('convert', help="Convert XML prompts to YAML or back")
+    convert.add_argument('input', nargs='?', help="File or directory; omit for the interactive menu")
+    convert.add_argument('--to', choices=['yaml', 'xml'], help="Target format when converting a directory")
+    convert.add_argument('--flat', action='store_true', help="Only convert files directly in the directory")
+    convert.add_argument('--processes', type=int, help="Conversion processes (default: CPU count)")
+    convert.add_argument('--force', action='store_true', help="Convert files whose output is already up to date")
+    convert.set_defaults(func=cmd_convert)
+
+    query = commands.add_parser('query', help="Look up tests in a local index")
+    query.add_argument('index', help="Index file written with --index")
+    query.add_argument('--json', action='store_true', help="Print the results as JSON")
+    lookups = query.add_subparsers(dest='query_command', required=True)
+    calls = lookups.add_parser('calls', help="List the tests that call any of the given functions")
+    calls.add_argument('functions', nargs='+')
+    search = lookups.add_parser('search', help="Full-text search over test descriptions and steps")
+    search.add_argument('text')
+    search.add_argument('--limit', type=int, default=20)
+    rebuild = lookups.add_parser('rebuild', help="Rebuild the index from a local SQLite store")
+    rebuild.add_argument('store')
+    query.set_defaults(func=cmd_query)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
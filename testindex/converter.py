@@ -0,0 +1,309 @@
+import xmltodict
+import yaml
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.parsers.expat import ExpatError
+
+EXTENSIONS = {'xml_to_yaml': ('.xml', '.yaml'), 'yaml_to_xml': ('.yaml', '.xml')}
+# xml_to_yaml switches to the streaming converter for inputs larger than this
+STREAMING_THRESHOLD = 50 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def output_path_for(input_file, conversion_type):
+    """Return the output path for a conversion: the input path with its extension swapped."""
+    source_ext, target_ext = EXTENSIONS[conversion_type]
+    root, ext = os.path.splitext(input_file)
+    return root + target_ext if ext == source_ext else input_file + target_ext
+
+class StreamingUnsupported(Exception):
+    """The XML uses a construct the streaming converter cannot write in xml_to_yaml's layout."""
+
+
+class _StreamingYamlWriter:
+    """Write the children of the XML root element to YAML one at a time.
+
+    Used as the xmltodict postprocessor: each completed child of the root is
+    written and dropped instead of being attached to the root, so xmltodict
+    still builds every child exactly as it would for the whole document. Each
+    child is dumped as ``{root: {tag: child}}`` with the ``root:`` header line
+    dropped, so indentation and line wrapping match a dump of the whole
+    document. A run of siblings with the same tag becomes a YAML list like
+    xmltodict would produce; only the latest child is held in memory.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.root = None
+        self.root_attrs = []
+        self.pending = None
+        self.list_tag = None
+        self.seen_tags = set()
+
+    def _write(self, mapping, skip_lines):
+        text = yaml.dump({self.root: mapping}, default_flow_style=False, sort_keys=False)
+        self.output.write(text.split('\n', skip_lines)[skip_lines])
+
+    def _flush_pending(self):
+        if self.pending is not None:
+            tag, item = self.pending
+            self._write({tag: item}, 1)
+            self.pending = None
+
+    def _add_child(self, root, tag, item):
+        if self.root is None:
+            self.root = root
+            self.output.write(yaml.dump({self.root: {'': None}}, default_flow_style=False).split('\n')[0] + '\n')
+            if self.root_attrs:
+                self._write(dict(self.root_attrs), 1)
+        if tag == self.list_tag:
+            self._write({tag: [item]}, 2)
+        elif self.pending is not None and self.pending[0] == tag:
+            self._write({tag: [self.pending[1], item]}, 1)
+            self.pending = None
+            self.list_tag = tag
+        elif tag in self.seen_tags:
+            # xmltodict gathers these into the list of the first one, which has already been written
+            raise StreamingUnsupported(f"<{tag}> elements under the root are not adjacent")
+        else:
+            self._flush_pending()
+            self.list_tag = None
+            self.seen_tags.add(tag)
+            self.pending = (tag, item)
+
+    def __call__(self, path, key, value):
+        if len(path) == 1 and key.startswith('@'):
+            self.root_attrs.append((key, value))
+        elif len(path) == 2 and key == path[1][0]:
+            self._add_child(path[0][0], key, value)
+            return None
+        return key, value
+
+    def close(self, document):
+        """Finish the file given the root value xmltodict returned without the streamed children."""
+        if self.root is None:
+            # No child elements, so the root value is complete
+            self.output.write(yaml.dump(document, default_flow_style=False, sort_keys=False))
+            return
+        self._flush_pending()
+        value = document[self.root]
+        text = value if isinstance(value, str) else (value or {}).get('#text')
+        if text is not None:
+            # Text of a root with children comes after them, as in xmltodict
+            self._write({'#text': text}, 1)
+
+
+def _read_chunks(xml_file, wrap_root):
+    """Yield the file in chunks, optionally wrapped in a <root> element after any XML declaration."""
+    first = xml_file.read(CHUNK_SIZE)
+    if wrap_root:
+        declaration = re.match(rb'\s*<\?xml[^>]*\?>', first)
+        split = declaration.end() if declaration else 0
+        yield first[:split] + b"<root>\n" + first[split:]
+    else:
+        yield first
+    while True:
+        chunk = xml_file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+    if wrap_root:
+        yield b"\n</root>"
+
+
+def xml_to_yaml_streaming(input_file, output_file=None):
+    """Convert an XML file to YAML without loading the whole document into memory.
+
+    Children of the root element are parsed and written one at a time, so peak
+    memory depends on the largest child rather than the file size. Output
+    matches xml_to_yaml; raises StreamingUnsupported if same-tag children of
+    the root are not adjacent, since xmltodict would merge them into one list.
+    """
+    output_file = output_file or output_path_for(input_file, 'xml_to_yaml')
+    temp_file = output_file + '.tmp'
+    try:
+        for wrap_root in (False, True):
+            try:
+                with open(input_file, 'rb') as xml_file, open(temp_file, 'w') as yaml_file:
+                    writer = _StreamingYamlWriter(yaml_file)
+                    document = xmltodict.parse(_read_chunks(xml_file, wrap_root), postprocessor=writer)
+                    writer.close(document)
+                os.replace(temp_file, output_file)
+                if wrap_root:
+                    print("Successfully parsed XML after adding root element.")
+                return output_file
+            except ExpatError as e:
+                if not wrap_root:
+                    print(f"XML parsing error: {str(e)}")
+                    print("Attempting to fix the XML structure...")
+                else:
+                    print(f"Failed to fix XML: {str(e)}")
+                    print("Please check if your XML file is well-formed.")
+        return None
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def xml_to_yaml(input_file):
+    """Convert XML file to YAML file while preserving structure."""
+    if os.path.getsize(input_file) > STREAMING_THRESHOLD:
+        try:
+            return xml_to_yaml_streaming(input_file)
+        except StreamingUnsupported as e:
+            print(f"Cannot stream {input_file} ({e}), converting it in memory.")
+    # Generate output filename by replacing .xml with .yaml
+    output_file = output_path_for(input_file, 'xml_to_yaml')
+    with open(input_file, 'r') as xml_file:
+        xml_string = xml_file.read()
+    try:
+        # Try to parse XML to dictionary
+        xml_dict = xmltodict.parse(xml_string)
+    except Exception as e:
+        print(f"XML parsing error: {str(e)}")
+        print("Attempting to fix the XML structure...")
+        # Try to fix common XML issues
+        # 1. Wrap everything in a root element if missing
+        fixed_xml = f"<root>\n{xml_string}\n</root>"
+        try:
+            xml_dict = xmltodict.parse(fixed_xml)
+            print("Successfully parsed XML after adding root element.")
+        except Exception as e2:
+            print(f"Failed to fix XML: {str(e2)}")
+            print("Please check if your XML file is well-formed.")
+            return None
+    # Convert to YAML with proper formatting
+    yaml_string = yaml.dump(xml_dict, default_flow_style=False, sort_keys=False)
+    with open(output_file, 'w') as yaml_file:
+        yaml_file.write(yaml_string)
+    return output_file
+def yaml_to_xml(input_file):
+    """Convert YAML file to XML file while preserving structure."""
+    # Generate output filename by replacing .yaml with .xml
+    output_file = output_path_for(input_file, 'yaml_to_xml')
+    with open(input_file, 'r') as yaml_file:
+        yaml_string = yaml_file.read()
+    # Parse YAML to dictionary
+    yaml_dict = yaml.safe_load(yaml_string)
+    # Convert to XML with proper formatting
+    xml_string = xmltodict.unparse(yaml_dict, pretty=True)
+    with open(output_file, 'w') as xml_file:
+        xml_file.write(xml_string)
+    return output_file
+
+def process_directory(input_dir, conversion_type):
+    """Process all files in a directory for conversion."""
+    converted_files = []
+    for filename in os.listdir(input_dir):
+        input_path = os.path.join(input_dir, filename)
+        # Skip directories
+        if os.path.isdir(input_path):
+            continue
+        if conversion_type == 'xml_to_yaml' and filename.endswith('.xml'):
+            output_path = xml_to_yaml(input_path)
+            converted_files.append((input_path, output_path))
+            print(f"Converted {input_path} to {output_path}")
+        elif conversion_type == 'yaml_to_xml' and filename.endswith('.yaml'):
+            output_path = yaml_to_xml(input_path)
+            converted_files.append((input_path, output_path))
+            print(f"Converted {input_path} to {output_path}")
+    return converted_files
+
+def _convert_file(input_path, conversion_type):
+    """Worker for convert_tree: convert one file and return (input, output, bytes read)."""
+    size = os.path.getsize(input_path)
+    if conversion_type == 'xml_to_yaml':
+        output_path = xml_to_yaml(input_path)
+    else:
+        output_path = yaml_to_xml(input_path)
+    return input_path, output_path, size
+
+def _is_up_to_date(input_path, output_path):
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+def convert_tree(input_dir, conversion_type, processes=None, force=False):
+    """Recursively convert every matching file under input_dir on a process pool.
+
+    Files whose output already exists and is newer than the input are skipped
+    unless force is set. Prints a summary with files and bytes per second.
+    """
+    source_ext = EXTENSIONS[conversion_type][0]
+    to_convert = []
+    skipped = 0
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if not filename.endswith(source_ext):
+                continue
+            input_path = os.path.join(dirpath, filename)
+            if not force and _is_up_to_date(input_path, output_path_for(input_path, conversion_type)):
+                skipped += 1
+            else:
+                to_convert.append(input_path)
+
+    converted_files = []
+    failed = 0
+    total_bytes = 0
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_convert_file, path, conversion_type) for path in to_convert]
+        for future in as_completed(futures):
+            try:
+                input_path, output_path, size = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Conversion failed: {e}")
+                continue
+            if output_path is None:
+                failed += 1
+                continue
+            converted_files.append((input_path, output_path))
+            total_bytes += size
+    elapsed = max(time.monotonic() - start, 1e-9)
+
+    print(f"Converted {len(converted_files)} files ({total_bytes} bytes) in {elapsed:.2f}s: "
+          f"{len(converted_files) / elapsed:.1f} files/s, {total_bytes / elapsed / 1e6:.2f} MB/s. "
+          f"Skipped {skipped} up-to-date files, {failed} failed.")
+    return converted_files
+
+def interactive_menu():
+    """Prompt for what to convert; the original command-line interface of this tool."""
+    print("XML-YAML Converter")
+    print("1. Convert single file")
+    print("2. Convert all files in directory")
+    print("3. Convert directory tree in parallel")
+    choice = input("Enter your choice (1/2/3): ").strip()
+    if choice == '1':
+        input_file = input("Enter input file path: ").strip()
+        if not os.path.exists(input_file):
+            print(f"Error: File {input_file} does not exist.")
+        elif input_file.endswith('.xml'):
+            output_file = xml_to_yaml(input_file)
+            print(f"Converted {input_file} to {output_file}")
+        elif input_file.endswith('.yaml'):
+            output_file = yaml_to_xml(input_file)
+            print(f"Converted {input_file} to {output_file}")
+        else:
+            print("Invalid file extension. Please provide a .xml or .yaml file.")
+    elif choice in ('2', '3'):
+        input_dir = input("Enter input directory: ").strip()
+        if not os.path.exists(input_dir) or not os.path.isdir(input_dir):
+            print(f"Error: Directory {input_dir} does not exist.")
+        else:
+            print("1. Convert XML to YAML")
+            print("2. Convert YAML to XML")
+            conversion_choice = input("Enter your choice (1/2): ").strip()
+            if conversion_choice not in ('1', '2'):
+                print("Invalid choice. Please enter 1 or 2.")
+            elif choice == '3':
+                conversion_type = 'xml_to_yaml' if conversion_choice == '1' else 'yaml_to_xml'
+                convert_tree(input_dir, conversion_type)
+            elif conversion_choice == '1':
+                converted_files = process_directory(input_dir, 'xml_to_yaml')
+                print(f"Converted {len(converted_files)} XML files to YAML.")
+            else:
+                converted_files = process_directory(input_dir, 'yaml_to_xml')
+                print(f"Converted {len(converted_files)} YAML files to XML.")
+    else:
+        print("Invalid choice. Please enter 1, 2 or 3.")
@@ -0,0 +1,164 @@
+import ast
+import difflib
+import hashlib
+import random
+import re
+import textwrap
+
+from .static_analysis import analyze_function
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+BANDS = 16
+DEFAULT_THRESHOLD = 0.7
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class _Normalizer(ast.NodeVisitor):
+    """Flatten a function body into node types and identifiers, with literals blanked out."""
+
+    def __init__(self):
+        self.tokens = []
+
+    def generic_visit(self, node):
+        self.tokens.append(type(node).__name__)
+        if isinstance(node, ast.Attribute):
+            self.tokens.append(node.attr)
+        elif isinstance(node, ast.Name):
+            self.tokens.append(node.id)
+        elif isinstance(node, ast.keyword) and node.arg:
+            self.tokens.append(node.arg)
+        super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        self.tokens.append('CONST')
+
+
+def normalized_tokens(function_code):
+    """Token stream of a function body that ignores its name, comments, formatting and literal values."""
+    try:
+        function = ast.parse(textwrap.dedent(function_code)).body[0]
+        normalizer = _Normalizer()
+        for statement in function.body:
+            normalizer.visit(statement)
+        return normalizer.tokens
+    except (SyntaxError, ValueError, IndexError, AttributeError):
+        return function_code.split()
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _permutations(num_permutations, seed=1):
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_permutations)]
+
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+def minhash(function_code):
+    """MinHash signature over the shingles of the normalized token stream."""
+    tokens = normalized_tokens(function_code)
+    shingles = {_hash(' '.join(tokens[i:i + SHINGLE_SIZE]))
+                for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))}
+    return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+def cluster_functions(test_functions, threshold=DEFAULT_THRESHOLD):
+    """Group near-duplicate test functions.
+
+    Candidates are found with LSH banding over MinHash signatures and kept when
+    their estimated similarity reaches ``threshold``. Returns a list of
+    clusters, each a list of names in extraction order whose first name is the
+    representative to send to the model.
+    """
+    names = list(test_functions)
+    position = {name: i for i, name in enumerate(names)}
+    signatures = {name: minhash(test_functions[name]) for name in names}
+    rows = NUM_PERMUTATIONS // BANDS
+    parent = {name: name for name in names}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for band in range(BANDS):
+        buckets = {}
+        for name in names:
+            buckets.setdefault(tuple(signatures[name][band * rows:(band + 1) * rows]), []).append(name)
+        for bucket in buckets.values():
+            for other in bucket[1:]:
+                if similarity(signatures[bucket[0]], signatures[other]) >= threshold:
+                    root_a, root_b = find(bucket[0]), find(other)
+                    if root_a != root_b:
+                        # Keep the earliest name as the root so it becomes the representative
+                        first, second = sorted((root_a, root_b), key=position.get)
+                        parent[second] = first
+
+    clusters = {}
+    for name in names:
+        clusters.setdefault(find(name), []).append(name)
+    return list(clusters.values())
+
+
+def _purpose(function_name):
+    return function_name.rsplit('.', 1)[-1].replace('test_', '', 1).replace('_', ' ')
+
+
+def derive_variant(representative_name, representative_code, document, variant_name, variant_code):
+    """Adapt the representative's analysis to a near-duplicate without calling the model.
+
+    Calls are aligned with difflib. A call swapped for another (for example
+    ``rebalance_in`` for ``rebalance_out``) is renamed in the text fields. The
+    dependency list loses calls the variant no longer makes and gains its new
+    ones, and the test's purpose phrase is replaced with the variant's.
+    """
+    rep_static = analyze_function(representative_name, representative_code)
+    var_static = analyze_function(variant_name, variant_code)
+    renames = {_purpose(representative_name): _purpose(variant_name)}
+    matcher = difflib.SequenceMatcher(a=rep_static["calls"], b=var_static["calls"], autojunk=False)
+    for tag, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+        if tag == 'replace' and a_end - a_start == b_end - b_start:
+            for old, new in zip(rep_static["calls"][a_start:a_end], var_static["calls"][b_start:b_end]):
+                renames.setdefault(old, new)
+                renames.setdefault(old.replace('_', ' '), new.replace('_', ' '))
+
+    # A test named just ``test_`` has an empty purpose, which would match everywhere
+    renames = {old: new for old, new in renames.items() if old and old != new}
+    # One pass over the text, longest match first, so a rename is never renamed again.
+    # Only whole words match, so renaming ``add`` leaves ``address`` alone.
+    alternatives = '|'.join(re.escape(old) for old in sorted(renames, key=len, reverse=True))
+    pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)') if renames else None
+
+    def rewrite(text):
+        return pattern.sub(lambda match: renames[match.group(0)], text) if pattern else text
+
+    test = document["test"]
+    variant_calls = set(var_static["calls"])
+    dependencies = [dep for dep in test.get("functions_dependencies", [])
+                    if dep in variant_calls or dep not in rep_static["calls"]]
+    dependencies += [dep for dep in var_static["dependencies"]
+                     if dep not in rep_static["calls"] and dep not in dependencies]
+    # The representative's source hash and file path do not describe the variant
+    meta = {key: value for key, value in document.get("meta", {}).items() if key not in ('source_hash', 'file_path')}
+    meta["derived_from"] = representative_name
+    if meta.get("confidence") == "high":
+        meta["confidence"] = "medium"
+    return {
+        "test": {
+            "description": rewrite(test.get("description", "")),
+            "steps": [rewrite(step) for step in test.get("steps", [])],
+            "functions_dependencies": dependencies,
+            "usage": rewrite(test.get("usage", "")),
+        },
+        "meta": meta,
+    }
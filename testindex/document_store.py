@@ -0,0 +1,304 @@
+import json
+import sqlite3
+import threading
+import time
+
+from . import metrics
+
+
+def connect_to_cluster(cluster_address, username, password):
+    from couchbase.auth import PasswordAuthenticator
+    from couchbase.cluster import Cluster, ClusterOptions
+    from couchbase.exceptions import CouchbaseException
+
+    try:
+        authenticator = PasswordAuthenticator(username, password)
+        cluster = Cluster(f'couchbase://{cluster_address}', ClusterOptions(authenticator))
+        
+        return cluster
+    except CouchbaseException as e:
+        print(f"Error connecting to the Couchbase cluster: {e}")
+        return None
+
+
+def get_collection(cluster, bucket_name):
+    """Return the default collection of a bucket, resolving it only once per cluster and bucket.
+
+    The handles are kept on the cluster object itself, so they go away with it.
+    """
+    collections = getattr(cluster, '_testindex_collections', None)
+    if collections is None:
+        collections = cluster._testindex_collections = {}
+    if bucket_name not in collections:
+        collections[bucket_name] = cluster.bucket(bucket_name).default_collection()
+    return collections[bucket_name]
+
+
+def store_document(cluster, bucket_name, doc_id, doc_content):
+    from couchbase.exceptions import CouchbaseException
+
+    try:
+        collection = get_collection(cluster, bucket_name)
+
+        with metrics.timed('store', documents=1):
+            collection.upsert(doc_id, doc_content)
+        
+        print(f"Document with ID '{doc_id}' stored successfully.")
+        # Print a preview of the stored document
+        if isinstance(doc_content, dict) and "test" in doc_content:
+            test_info = doc_content["test"]
+            print(f"Description: {test_info.get('description', 'N/A')}")
+            print(f"Steps: {len(test_info.get('steps', []))} steps included")
+            deps = test_info.get('functions_dependencies', [])
+            print(f"Dependencies: {', '.join(deps) if deps else 'None'}")
+        return True
+    except CouchbaseException as e:
+        print(f"Error storing the document: {e}")
+        return False
+
+
+class CouchbaseStore:
+    """Document store on a Couchbase bucket that resolves the collection handle once.
+
+    The Couchbase SDK is imported here rather than at module load, so the
+    SQLite store and the rest of the package work without it.
+    """
+
+    def __init__(self, cluster, bucket_name):
+        from couchbase.exceptions import CouchbaseException, DocumentNotFoundException
+        from couchbase.options import QueryOptions
+
+        self._not_found = DocumentNotFoundException
+        self._query_options = QueryOptions
+        # Exceptions BatchWriter reports as a failed batch instead of raising
+        self.errors = (CouchbaseException,)
+        self.cluster = cluster
+        self.bucket_name = bucket_name
+        self.collection = cluster.bucket(bucket_name).default_collection()
+
+    def upsert_many(self, documents):
+        """Upsert a dict of documents in one multi-op; return {doc_id: error or None}."""
+        result = self.collection.upsert_multi(documents)
+        errors = {doc_id: str(e) for doc_id, e in result.exceptions.items()}
+        return {doc_id: errors.get(doc_id) for doc_id in documents}
+
+    def remove_many(self, doc_ids):
+        """Remove documents in one multi-op; return {doc_id: error or None}."""
+        result = self.collection.remove_multi(list(doc_ids))
+        errors = {doc_id: str(e) for doc_id, e in result.exceptions.items()
+                  if not isinstance(e, self._not_found)}
+        return {doc_id: errors.get(doc_id) for doc_id in doc_ids}
+
+    def get(self, doc_id):
+        """Return the stored document, or None if it does not exist."""
+        try:
+            return self.collection.get(doc_id).content_as[dict]
+        except self._not_found:
+            return None
+
+    def ids_for_file(self, file_path):
+        """Return {doc_id: source_hash} for the documents recorded against a test file.
+
+        Needs an index on ``meta.file_path`` (or a primary index) in the bucket.
+        """
+        statement = ("SELECT META(d).id AS id, d.meta.source_hash AS source_hash "
+                     f"FROM `{self.bucket_name}` d WHERE d.meta.file_path = $file_path")
+        rows = self.cluster.query(statement, self._query_options(named_parameters={'file_path': file_path}))
+        return {row['id']: row.get('source_hash') for row in rows}
+
+    def create_indexes(self):
+        """Create the GSI indexes behind ids_for_file and ids_calling if they do not exist yet."""
+        statements = [
+            f"CREATE INDEX IF NOT EXISTS idx_file_path ON `{self.bucket_name}`(`meta`.file_path)",
+            f"CREATE INDEX IF NOT EXISTS idx_dependencies ON `{self.bucket_name}`"
+            "(DISTINCT ARRAY dep FOR dep IN test.functions_dependencies END)",
+        ]
+        for statement in statements:
+            self.cluster.query(statement).execute()
+            print(f"Ensured index: {statement}")
+
+    def ids_calling(self, dependencies):
+        """Return the ids of documents whose dependency list contains any of the given names."""
+        statement = (f"SELECT RAW META(d).id FROM `{self.bucket_name}` d "
+                     "WHERE ANY dep IN d.test.functions_dependencies SATISFIES dep IN $deps END")
+        options = self._query_options(named_parameters={'deps': list(dependencies)})
+        return sorted(self.cluster.query(statement, options))
+
+    def iter_documents(self):
+        """Yield every (doc_id, document) pair in the bucket."""
+        statement = f"SELECT META(d).id AS id, d AS content FROM `{self.bucket_name}` d WHERE d.test IS NOT MISSING"
+        for row in self.cluster.query(statement):
+            yield row['id'], row['content']
+
+
+class SQLiteStore:
+    """Local stand-in for a Couchbase bucket, backed by SQLite (use ':memory:' for tests)."""
+
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        self._conn.commit()
+
+    def upsert_many(self, documents):
+        rows = [(doc_id, json.dumps(doc)) for doc_id, doc in documents.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO documents (id, content) VALUES (?, ?)", rows)
+            self._conn.commit()
+        return {doc_id: None for doc_id in documents}
+
+    def remove_many(self, doc_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in doc_ids])
+            self._conn.commit()
+        return {doc_id: None for doc_id in doc_ids}
+
+    def get(self, doc_id):
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids_for_file(self, file_path):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, json_extract(content, '$.meta.source_hash') FROM documents"
+                " WHERE json_extract(content, '$.meta.file_path') = ?", (file_path,)
+            ).fetchall()
+        return dict(rows)
+
+    def ids_calling(self, dependencies):
+        dependencies = list(dependencies)
+        placeholders = ', '.join('?' for _ in dependencies)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT documents.id FROM documents, json_each(documents.content, '$.test.functions_dependencies')"
+                f" WHERE json_each.value IN ({placeholders}) ORDER BY documents.id", dependencies
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_documents(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, content FROM documents ORDER BY id").fetchall()
+        for doc_id, content in rows:
+            yield doc_id, json.loads(content)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JsonlStore:
+    """Write documents as JSON lines instead of storing them, to load later with ``testindex store``.
+
+    Each line is ``{"id": ..., "document": ...}``, or ``{"id": ..., "removed": true}``
+    for a removal. Documents written in this run can be read back with get.
+    """
+
+    errors = (OSError,)
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+        self._documents = {}
+
+    def _write(self, entries):
+        with self._lock:
+            for entry in entries:
+                self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def upsert_many(self, documents):
+        self._write({"id": doc_id, "document": document} for doc_id, document in documents.items())
+        self._documents.update(documents)
+        return {doc_id: None for doc_id in documents}
+
+    def remove_many(self, doc_ids):
+        self._write({"id": doc_id, "removed": True} for doc_id in doc_ids)
+        for doc_id in doc_ids:
+            self._documents.pop(doc_id, None)
+        return {doc_id: None for doc_id in doc_ids}
+
+    def get(self, doc_id):
+        return self._documents.get(doc_id)
+
+    def ids_for_file(self, file_path):
+        return {doc_id: document.get("meta", {}).get("source_hash") for doc_id, document in self._documents.items()
+                if document.get("meta", {}).get("file_path") == file_path}
+
+    def iter_documents(self):
+        return iter(list(self._documents.items()))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_jsonl_documents(path):
+    """Yield (doc_id, document) pairs from a JsonlStore file; document is None for a removal."""
+    with open(path) as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["id"], None if entry.get("removed") else entry["document"]
+
+
+class BatchWriter:
+    """Buffer documents and write them to a store in batches.
+
+    A batch is flushed once it holds ``batch_size`` documents or its oldest
+    document has waited ``flush_interval`` seconds. ``on_result`` is called as
+    ``on_result(doc_id, document, error)`` for every document, with error None
+    on success.
+    """
+
+    def __init__(self, store, batch_size=50, flush_interval=5.0, on_result=None):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_result = on_result
+        self.stored = 0
+        self.failed = 0
+        self._buffer = {}
+        self._oldest = None
+
+    def add(self, doc_id, document):
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        self._buffer[doc_id] = document
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        if self._buffer and time.monotonic() - self._oldest >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, {}
+        with metrics.timed('store', documents=len(batch), store=type(self.store).__name__) as event:
+            try:
+                results = self.store.upsert_many(batch)
+            except getattr(self.store, 'errors', ()) as e:
+                print(f"Error storing batch of {len(batch)} documents: {e}")
+                results = {doc_id: str(e) for doc_id in batch}
+            event['failed'] = sum(1 for error in results.values() if error is not None)
+
+        for doc_id, error in results.items():
+            if error is None:
+                self.stored += 1
+                print(f"Document with ID '{doc_id}' stored successfully.")
+            else:
+                self.failed += 1
+                print(f"Error storing document '{doc_id}': {error}")
+            if self.on_result is not None:
+                self.on_result(doc_id, batch[doc_id], error)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,162 @@
+import ast
+import fnmatch
+import os
+import re
+import textwrap
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+TEST_FUNC_PATTERN = r'^\s*def\s+(test_[a-zA-Z0-9_]*)\s*\('
+# pytest's default python_files patterns
+TEST_FILE_PATTERNS = ('test_*.py', '*_test.py')
+
+
+def _iter_python_files(root):
+    """Yield Python files under root in a stable order, skipping hidden and cache directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != '__pycache__')
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield os.path.join(dirpath, filename)
+
+
+def _decorator_name(node):
+    """Return the dotted name of a decorator, ignoring any call arguments."""
+    if isinstance(node, ast.Call):
+        node = node.func
+    try:
+        return ast.unparse(node)
+    except Exception:
+        return type(node).__name__
+
+
+def _walk_tests(body, class_name=None):
+    """Yield (node, class_name) for test functions, descending into classes but not into functions."""
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('test_'):
+            yield node, class_name
+        elif isinstance(node, ast.ClassDef):
+            qualified = f"{class_name}.{node.name}" if class_name else node.name
+            yield from _walk_tests(node.body, qualified)
+
+
+def _regex_records(file_path, content):
+    """Fallback for files that do not parse: the original regex scan, which ends each
+    function at the start of the next test function."""
+    matches = list(re.finditer(TEST_FUNC_PATTERN, content, re.MULTILINE))
+    for i, match in enumerate(matches):
+        end_pos = matches[i + 1].start() if i < len(matches) - 1 else len(content)
+        source = content[match.start():end_pos].strip()
+        lineno = content.count('\n', 0, match.start()) + 1
+        yield {
+            "name": match.group(1),
+            "qualname": match.group(1),
+            "class_name": None,
+            "file_path": file_path,
+            "lineno": lineno,
+            "end_lineno": lineno + source.count('\n'),
+            "decorators": [],
+            "source": source,
+        }
+
+
+def iter_file_test_functions(file_path):
+    """Yield a record for each test function in one file with its exact source span.
+
+    Each record holds the function name, the qualified name including any
+    enclosing classes, the decorators, the first and last line (decorators
+    included) and the dedented source of just that function.
+    """
+    with open(file_path, 'r') as file:
+        content = file.read()
+    try:
+        tree = ast.parse(content, filename=file_path)
+    except (SyntaxError, ValueError) as e:
+        print(f"Could not parse {file_path} ({e}), falling back to regex extraction.")
+        yield from _regex_records(file_path, content)
+        return
+
+    lines = content.splitlines()
+    for node, class_name in _walk_tests(tree.body):
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        source = textwrap.dedent('\n'.join(lines[start - 1:node.end_lineno]))
+        yield {
+            "name": node.name,
+            "qualname": f"{class_name}.{node.name}" if class_name else node.name,
+            "class_name": class_name,
+            "file_path": file_path,
+            "lineno": start,
+            "end_lineno": node.end_lineno,
+            "decorators": [_decorator_name(d) for d in node.decorator_list],
+            "source": source,
+        }
+
+
+def iter_test_functions(path):
+    """Yield test function records for a file, or for every Python file under a directory.
+
+    Files are read and parsed one at a time, so only a single file is held in
+    memory while walking large trees.
+    """
+    files = _iter_python_files(path) if os.path.isdir(path) else [path]
+    for file_path in files:
+        try:
+            yield from iter_file_test_functions(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading {file_path}: {e}")
+
+
+def discover_test_modules(root, patterns=TEST_FILE_PATTERNS):
+    """Yield the test modules under root whose file names match one of the glob patterns."""
+    for file_path in _iter_python_files(root):
+        if any(fnmatch.fnmatch(os.path.basename(file_path), pattern) for pattern in patterns):
+            yield file_path
+
+
+def module_name(file_path, root):
+    """Dotted module name of a file relative to the crawl root."""
+    relative = os.path.splitext(os.path.relpath(file_path, root))[0]
+    return relative.replace(os.sep, '.')
+
+
+def document_id(file_path, qualname, root='.'):
+    """Id of the document stored for a test: its module relative to root plus its qualified name.
+
+    Tests with the same name in different modules, e.g. ``TestFoo.test_basic``
+    in two packages of a monorepo, get different ids.
+    """
+    return f"{module_name(file_path, root)}.{qualname}"
+
+
+def _extract_module(file_path, root):
+    """Process pool worker: extract every test function record from one module."""
+    try:
+        records = list(iter_file_test_functions(file_path))
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading {file_path}: {e}")
+        return []
+    module = module_name(file_path, root)
+    for record in records:
+        record["module"] = module
+    return records
+
+
+def crawl_repository(root, patterns=TEST_FILE_PATTERNS, processes=None):
+    """Extract test functions from every test module under root on a process pool.
+
+    Records are yielded module by module in discovery order while the pool
+    keeps working ahead. At most a few modules per process are in flight, so
+    memory stays bounded on very large repositories. Each record has the same
+    fields as iter_file_test_functions plus ``module``.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_in_flight = processes * 4
+    modules = discover_test_modules(root, patterns)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for file_path in modules:
+            in_flight.append(executor.submit(_extract_module, file_path, root))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
@@ -0,0 +1,72 @@
+import os
+import subprocess
+
+from .analysis_cache import source_hash
+from .extractor import document_id, iter_file_test_functions
+
+
+def changed_files(revision_range, repo_root='.'):
+    """Return the Python files touched in a git revision range, relative to ``repo_root``.
+
+    ``repo_root`` may be a subdirectory of the git work tree, in which case
+    only files under it are listed. A single revision such as ``HEAD~1``
+    compares it against the working tree; ``A..B`` compares two commits.
+    Deleted files are included so their tests can be removed from the store.
+    """
+    output = subprocess.run(
+        ['git', 'diff', '--name-only', '--relative', '--no-renames', revision_range, '--', '*.py'],
+        cwd=repo_root, check=True, capture_output=True, text=True,
+    ).stdout
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def plan_incremental(store, files, repo_root='.'):
+    """Work out which tests in the given files need re-analysis and which documents are stale.
+
+    Returns ``(test_functions, file_paths, stale_ids)``: the sources of new or
+    changed tests keyed by document id, the file each of them lives in, and the
+    ids of stored documents whose test no longer exists in its file.
+    """
+    test_functions = {}
+    file_paths = {}
+    current_ids = set()
+    stored_ids = {}
+    unchanged = 0
+
+    for file_path in files:
+        relative = os.path.normpath(file_path)
+        stored = store.ids_for_file(relative)
+        stored_ids.update(stored)
+
+        absolute = os.path.join(repo_root, relative)
+        if not os.path.exists(absolute):
+            continue
+        for record in iter_file_test_functions(absolute):
+            doc_id = document_id(relative, record["qualname"])
+            current_ids.add(doc_id)
+            if stored.get(doc_id) == source_hash(record["source"]):
+                unchanged += 1
+                continue
+            test_functions[doc_id] = record["source"]
+            file_paths[doc_id] = relative
+
+    # A test that moved to another changed file is re-stored under its new path, not deleted
+    stale_ids = sorted(doc_id for doc_id in stored_ids if doc_id not in current_ids)
+    print(f"{len(files)} changed files: {len(test_functions)} tests to analyze, "
+          f"{unchanged} unchanged, {len(stale_ids)} removed.")
+    return test_functions, file_paths, stale_ids
+
+
+def remove_stale(store, stale_ids):
+    """Delete documents for tests that no longer exist."""
+    if not stale_ids:
+        return 0
+    results = store.remove_many(stale_ids)
+    removed = 0
+    for doc_id, error in results.items():
+        if error is None:
+            removed += 1
+            print(f"Removed document '{doc_id}'.")
+        else:
+            print(f"Error removing document '{doc_id}': {error}")
+    return removed
@@ -0,0 +1,115 @@
+import json
+
+REQUIRED_KEYS = ("description", "steps", "functions_dependencies", "usage")
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+
+
+class JsonObjectScanner:
+    """Incrementally find the analysis JSON object in a stream of model output.
+
+    Text is fed in chunks as it arrives. ``feed`` returns the parsed object as
+    soon as a complete JSON object holding all of ``required_keys`` (directly
+    or inside a "test" wrapper) has been seen, and None until then. A stray
+    ``{`` in prose before the answer does not hide it, since any object that
+    closes is checked, however many unclosed braces come before it.
+
+    Anything inside a ``<think>`` block is ignored wherever the block starts,
+    so objects the model sketches while reasoning are not mistaken for the
+    answer. Models whose chat template opens the block itself, so that only
+    ``</think>`` appears in the output, need ``reasoning=True``: their output
+    is ignored up to the first ``</think>``.
+    """
+
+    def __init__(self, required_keys=REQUIRED_KEYS, reasoning=False):
+        self.required_keys = required_keys
+        self._chunks = []
+        # Text not yet ruled out, from the oldest unclosed brace or the scan position on
+        self._buffer = ''
+        self._pos = 0
+        self._thinking = reasoning
+        self._starts = []
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def text(self):
+        """Everything fed so far."""
+        return ''.join(self._chunks)
+
+    def _reset(self):
+        self._starts = []
+        self._in_string = self._escape = False
+
+    def _matches(self, candidate):
+        if isinstance(candidate, dict) and isinstance(candidate.get("test"), dict):
+            candidate = candidate["test"]
+        return isinstance(candidate, dict) and all(key in candidate for key in self.required_keys)
+
+    def _parse(self, start, end):
+        """Return the object at _buffer[start:end] if it is the analysis, else None."""
+        snippet = self._buffer[start:end]
+        # Cheap check first, so nested objects without the keys are never parsed
+        if not all(f'"{key}"' in snippet for key in self.required_keys):
+            return None
+        try:
+            candidate = json.loads(snippet)
+        except json.JSONDecodeError:
+            return None
+        return candidate if self._matches(candidate) else None
+
+    def _trim(self, keep_from):
+        """Drop buffered text before ``keep_from``, which is no longer needed."""
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._starts = [start - keep_from for start in self._starts]
+            self._pos -= keep_from
+
+    def feed(self, chunk):
+        self._chunks.append(chunk)
+        self._buffer += chunk
+        text = self._buffer
+        i = self._pos
+        while i < len(text):
+            if self._thinking:
+                end = text.find(THINK_CLOSE, i)
+                if end == -1:
+                    # Search only the new text next time, keeping room for a tag split across chunks
+                    i = max(i, len(text) - len(THINK_CLOSE) + 1)
+                    break
+                self._thinking = False
+                i = end + len(THINK_CLOSE)
+                continue
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '<':
+                if text.startswith(THINK_OPEN, i) or text.startswith(THINK_CLOSE, i):
+                    # Objects opened before a reasoning tag are part of the reasoning
+                    self._reset()
+                    self._thinking = text.startswith(THINK_OPEN, i)
+                    i += len(THINK_OPEN) if self._thinking else len(THINK_CLOSE)
+                    continue
+                tail = text[i:]
+                if len(tail) < len(THINK_CLOSE) and (THINK_OPEN.startswith(tail) or THINK_CLOSE.startswith(tail)):
+                    # Wait for the rest of what may be a tag
+                    break
+            elif char == '"' and self._starts:
+                self._in_string = True
+            elif char == '{':
+                self._starts.append(i)
+            elif char == '}' and self._starts:
+                candidate = self._parse(self._starts.pop(), i + 1)
+                if candidate is not None:
+                    self._pos = i + 1
+                    self._reset()
+                    return candidate
+            i += 1
+        self._pos = i
+        self._trim(self._starts[0] if self._starts else i)
+        return None
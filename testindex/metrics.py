@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Numeric event fields that are also summed into counters, e.g. Ollama token counts
+SUMMED_FIELDS = ('prompt_eval_count', 'eval_count', 'total_duration', 'streamed_tokens', 'documents', 'failed')
+PROMETHEUS_PREFIX = 'testindex'
+
+_lock = threading.Lock()
+_jsonl_file = None
+_stage_seconds = defaultdict(float)
+_stage_calls = defaultdict(int)
+_counters = defaultdict(float)
+
+
+def configure(jsonl_path=None):
+    """Start writing one JSON line per recorded event to jsonl_path (appending)."""
+    global _jsonl_file
+    with _lock:
+        if _jsonl_file is not None:
+            _jsonl_file.close()
+        _jsonl_file = open(jsonl_path, 'a') if jsonl_path else None
+
+
+def record(stage, seconds, **fields):
+    """Record one timed event for a pipeline stage."""
+    with _lock:
+        _stage_seconds[stage] += seconds
+        _stage_calls[stage] += 1
+        for name in SUMMED_FIELDS:
+            value = fields.get(name)
+            if isinstance(value, (int, float)):
+                _counters[(name, (('stage', stage),))] += value
+        if _jsonl_file is not None:
+            event = {"ts": round(time.time(), 6), "stage": stage, "seconds": round(seconds, 6)}
+            event.update(fields)
+            _jsonl_file.write(json.dumps(event, default=str) + '\n')
+            _jsonl_file.flush()
+
+
+def increment(name, value=1, **labels):
+    """Add to a labelled counter, e.g. increment('analysis_outcome', outcome='cache_hit')."""
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += value
+
+
+@contextmanager
+def timed(stage, **fields):
+    """Time the enclosed block as one event of ``stage``.
+
+    Yields the event dict so the block can attach fields such as token counts.
+    If the block raises, the exception type is recorded and the exception re-raised.
+    """
+    event = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event['error'] = type(e).__name__
+        raise
+    finally:
+        record(stage, time.perf_counter() - start, **event)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{str(value)}"' for key, value in pairs) + '}'
+
+
+def write_prometheus(path):
+    """Write all stage timings and counters to a Prometheus text-format file."""
+    with _lock:
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds_total Wall time spent in each pipeline stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds_total counter",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                  for stage, seconds in sorted(_stage_seconds.items())]
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_calls_total Number of events recorded for each pipeline stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_calls_total counter",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_stage_calls_total{{stage="{stage}"}} {calls}'
+                  for stage, calls in sorted(_stage_calls.items())]
+        typed = set()
+        for (name, labels), value in sorted(_counters.items()):
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value:g}")
+    with open(path, 'w') as prom_file:
+        prom_file.write('\n'.join(lines) + '\n')
+
+
+def snapshot():
+    """Return the aggregated stage timings and counters as plain dicts."""
+    with _lock:
+        return {
+            "stage_seconds": dict(_stage_seconds),
+            "stage_calls": dict(_stage_calls),
+            "counters": {f"{name}{_labels(labels)}": value for (name, labels), value in _counters.items()},
+        }
+
+
+def close():
+    configure(None)
@@ -0,0 +1,169 @@
+import threading
+import time
+
+from . import metrics
+from .resilience import is_retryable
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every backend that serves a model has failed or is marked unhealthy."""
+
+
+class Backend:
+    """One Ollama server, with its in-flight request count and health state."""
+
+    def __init__(self, host, timeout=None):
+        import ollama
+
+        self.host = host
+        self.client = ollama.Client(host=host, timeout=timeout)
+        self.outstanding = 0
+        self.healthy = True
+        self.models = None  # Unknown until the first health check
+        self.retry_at = 0.0
+
+    def serves(self, model):
+        return self.models is None or model in self.models or f"{model}:latest" in self.models
+
+    def __repr__(self):
+        return f"Backend({self.host!r}, outstanding={self.outstanding}, healthy={self.healthy})"
+
+
+class _RoutedStream:
+    """Wrap a response stream so the backend's outstanding slot is held until it is closed."""
+
+    def __init__(self, router, backend, stream):
+        self.router = router
+        self.backend = backend
+        self.stream = iter(stream)
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.stream)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception as e:
+            # Streamed requests only reach the server here, so request errors show up on the first chunk
+            self.close(failed=is_retryable(e))
+            raise
+
+    def close(self, failed=False):
+        if not self._closed:
+            self._closed = True
+            if hasattr(self.stream, 'close'):
+                self.stream.close()
+            self.router._release(self.backend, failed)
+
+
+class ModelRouter:
+    """Spread chat requests over several Ollama hosts and escalate between models.
+
+    Each request goes to the healthy backend serving the model with the fewest
+    outstanding requests. A backend that fails is taken out of rotation for
+    ``cooldown`` seconds and the request is retried on another one. Request
+    errors such as an unknown model are raised as they are, since another
+    backend would reject the request too. ``models`` is an escalation ladder
+    from smallest to largest. Functions of up to ``short_prompt_tokens`` code
+    tokens start at the smallest model. Longer ones go straight to the largest.
+    """
+
+    def __init__(self, hosts, models, short_prompt_tokens=400, cooldown=30.0, max_attempts=3, timeout=None):
+        self.backends = [Backend(host, timeout=timeout) for host in hosts]
+        self.models = list(models)
+        self.short_prompt_tokens = short_prompt_tokens
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    @property
+    def name(self):
+        """Identifies the model ladder in cache keys."""
+        return '>'.join(self.models)
+
+    def models_for(self, code_tokens):
+        """Return the models to try for a function of ``code_tokens`` tokens, in escalation order.
+
+        Only the code counts, not the prompt template around it, which is the
+        same size for every function.
+        """
+        if code_tokens <= self.short_prompt_tokens:
+            return list(self.models)
+        return self.models[-1:]
+
+    def check_health(self):
+        """Ask every backend which models it has; mark the unreachable ones unhealthy."""
+        for backend in self.backends:
+            try:
+                listing = backend.client.list()
+                models = {entry.get('model') or entry.get('name') for entry in listing['models']}
+                with self._lock:
+                    backend.models, backend.healthy = models, True
+            except Exception as e:
+                print(f"Ollama backend {backend.host} failed its health check: {e}")
+                with self._lock:
+                    backend.healthy, backend.retry_at = False, time.monotonic() + self.cooldown
+
+    def start_health_checks(self, interval=30.0):
+        """Re-check backend health every ``interval`` seconds on a daemon thread."""
+        def run():
+            while True:
+                self.check_health()
+                time.sleep(interval)
+
+        self._health_thread = threading.Thread(target=run, daemon=True)
+        self._health_thread.start()
+
+    def _acquire(self, model, exclude):
+        """Pick the least-loaded usable backend for the model and count the request against it."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [backend for backend in self.backends
+                          if backend not in exclude and backend.serves(model)
+                          and (backend.healthy or now >= backend.retry_at)]
+            if not candidates:
+                raise NoBackendAvailable(f"No healthy Ollama backend serves {model}")
+            backend = min(candidates, key=lambda b: (not b.healthy, b.outstanding))
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend, failed):
+        with self._lock:
+            backend.outstanding -= 1
+            if failed:
+                backend.healthy, backend.retry_at = False, time.monotonic() + self.cooldown
+            else:
+                backend.healthy = True
+
+    def chat(self, model, messages, stream=False, options=None):
+        """Send a chat request like ``ollama.chat``, retrying on other backends after a failure."""
+        tried = []
+        last_error = None
+        for _ in range(min(self.max_attempts, len(self.backends))):
+            try:
+                backend = self._acquire(model, tried)
+            except NoBackendAvailable:
+                break
+            tried.append(backend)
+            try:
+                response = backend.client.chat(model=model, messages=messages, stream=stream, options=options)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The backend answered, so it is healthy; the request itself was refused
+                    self._release(backend, failed=False)
+                    raise
+                self._release(backend, failed=True)
+                last_error = e
+                print(f"Ollama backend {backend.host} failed for {model}: {e}")
+                metrics.increment('backend_failures', host=backend.host)
+                continue
+            if stream:
+                return _RoutedStream(self, backend, response)
+            self._release(backend, failed=False)
+            return response
+        raise NoBackendAvailable(f"All Ollama backends failed for {model}: {last_error}")
@@ -0,0 +1,328 @@
+"""Pipeline stages: extract test functions, analyze them and write the documents to a store."""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from . import metrics
+from .analysis import analyze_batch, annotate_document, get_test_analysis, unavailable_fallback
+from .dedup import derive_variant
+from .document_store import BatchWriter
+from .extractor import crawl_repository, document_id, iter_test_functions
+from .prompt_builder import compact_source, count_tokens, pack_batches
+from .resilience import ModelUnavailable
+from .static_analysis import analyze_function, is_low_confidence, static_document
+
+
+def extract_test_functions(file_path, file_paths=None, root='.'):
+    """Extract test functions from a file or directory tree, keyed by document_id relative to root.
+
+    If a ``file_paths`` dict is given, it is filled with the file each function
+    came from, relative to root.
+    """
+    try:
+        test_functions = {}
+
+        with metrics.timed('extract', path=file_path) as event:
+            for record in iter_test_functions(file_path):
+                func_name = document_id(record["file_path"], record["qualname"], root)
+                if func_name in test_functions:
+                    print(f"Duplicate test function {func_name} in {record['file_path']}, keeping the first one.")
+                    continue
+                test_functions[func_name] = record["source"]
+                if file_paths is not None:
+                    file_paths[func_name] = os.path.relpath(record["file_path"], root)
+                
+                print(f"Found function: {func_name} ({record['file_path']}:{record['lineno']}-{record['end_lineno']})")
+            event['functions'] = len(test_functions)
+        
+        # Printing the extracted function names
+        print(f"Extracted {len(test_functions)} test functions:", list(test_functions.keys()))
+        
+        return test_functions
+    except Exception as e:
+        print(f"Error extracting functions: {e}")
+        import traceback
+        traceback.print_exc()
+        return {}
+
+
+def crawl_test_functions(path, file_paths, processes=None, root='.'):
+    """Stream (document_id, source) pairs from a parallel crawl of the test modules under path.
+
+    Ids and the file paths put in ``file_paths`` as the pairs are produced are
+    relative to root, the same as in extract_test_functions and incremental runs.
+    """
+    count = 0
+    for record in crawl_repository(path, processes=processes):
+        func_name = document_id(record["file_path"], record["qualname"], root)
+        if func_name in file_paths:
+            print(f"Duplicate test function {func_name} in {record['file_path']}, keeping the first one.")
+            continue
+        file_paths[func_name] = os.path.relpath(record["file_path"], root)
+        count += 1
+        yield func_name, record["source"]
+    print(f"Crawled {count} test functions under {path}.")
+
+
+def _chain_results(*callbacks):
+    """Combine BatchWriter ``on_result`` callbacks, skipping the ones that are None."""
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if not callbacks:
+        return None
+
+    def on_result(doc_id, document, error):
+        for callback in callbacks:
+            callback(doc_id, document, error)
+    return on_result
+
+
+def _items(test_functions):
+    """Accept either a dict of sources or a stream of (name, source) pairs."""
+    return test_functions.items() if isinstance(test_functions, dict) else test_functions
+
+
+def _document_writer(writer, write_queue):
+    """Writer stage: batch analyses taken from the queue until a None sentinel arrives."""
+    while True:
+        try:
+            item = write_queue.get(timeout=writer.flush_interval)
+        except queue.Empty:
+            # Nothing new arrived, but a partial batch may have waited long enough
+            writer.flush_if_due()
+            continue
+        try:
+            if item is None:
+                writer.close()
+                return
+            writer.add(*item)
+        except Exception as e:
+            # Keep draining the queue so the dispatcher never blocks on a dead writer
+            print(f"Error in document writer: {e}")
+        finally:
+            write_queue.task_done()
+
+
+def _work_units(items, prompt_batch=None, compact=True):
+    """Split (name, code) pairs into lists analyzed by one request each.
+
+    Without ``prompt_batch`` every function is a unit of its own. Otherwise
+    ``prompt_batch`` is ``(token_budget, max_functions)`` for pack_batches.
+    """
+    if not prompt_batch:
+        return ([item] for item in items)
+    size = (lambda code: count_tokens(compact_source(code))) if compact else count_tokens
+    return pack_batches(items, *prompt_batch, size=size)
+
+
+def _analyze_unit(unit, cache, analysis_options):
+    """Return {name: document} for a unit of one or more functions."""
+    if len(unit) == 1:
+        func_name, func_code = unit[0]
+        return {func_name: get_test_analysis(func_name, func_code, cache, **analysis_options)}
+    return analyze_batch(unit, cache, **analysis_options)
+
+
+def analyze_concurrently(store, test_functions, max_workers=4, task_timeout=600, queue_size=None,
+                         cache=None, batch_size=50, flush_interval=5.0, file_paths=None, analysis_options=None,
+                         on_result=None, deferred_rounds=2, deferred_delay=30.0, prompt_batch=None):
+    """Analyze test functions on a bounded worker pool and store the results from a writer thread.
+
+    At most ``max_workers`` Ollama requests are in flight at once, and the writer
+    queue holds at most ``queue_size`` analyses, so a slow store throttles the
+    dispatcher instead of piling up results in memory. The writer upserts to
+    ``store`` in batches of ``batch_size`` or every ``flush_interval`` seconds.
+    Progress is reported in the order the functions were submitted. A request
+    that does not finish within ``task_timeout`` seconds is skipped; unless
+    ``analysis_options`` give another ``timeout``, the Ollama client gives up
+    on it after the same time, and a ResilientClient starts no retry after it,
+    so a hung request does not keep its worker.
+    Functions that fail with ModelUnavailable are deferred and retried after
+    ``deferred_delay`` seconds, up to ``deferred_rounds`` times, before they
+    get a static analysis. With ``prompt_batch`` small functions share one
+    request, see _work_units. ``analysis_options`` are passed to
+    get_test_analysis as keyword arguments, and ``on_result`` to the BatchWriter.
+    """
+    file_paths = {} if file_paths is None else file_paths
+    analysis_options = dict(analysis_options or {})
+    analysis_options.setdefault('timeout', task_timeout)
+    compact = analysis_options.get('compact', True)
+    total = len(test_functions) if isinstance(test_functions, dict) else '?'
+    write_queue = queue.Queue(maxsize=queue_size or max_workers * 2)
+    stats = {'stored': 0, 'failed': 0, 'skipped': 0}
+    writer = BatchWriter(store, batch_size=batch_size, flush_interval=flush_interval, on_result=on_result)
+    writer_thread = threading.Thread(target=_document_writer, args=(writer, write_queue), daemon=True)
+    writer_thread.start()
+
+    pending = iter(_work_units(_items(test_functions), prompt_batch, compact))
+    in_flight = deque()
+    deferred = []
+    retry_round = 0
+    done = 0
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            # Keep the pool full, but never queue more work than there are workers
+            while len(in_flight) < max_workers:
+                unit = next(pending, None)
+                if unit is None:
+                    break
+                # Retries inside the task stop once the dispatcher would give up on it
+                options = dict(analysis_options, deadline=time.monotonic() + task_timeout)
+                future = executor.submit(_analyze_unit, unit, cache, options)
+                in_flight.append((unit, future, time.monotonic()))
+            if not in_flight:
+                if deferred and retry_round < deferred_rounds:
+                    retry_round += 1
+                    print(f"Retrying {len(deferred)} deferred functions in {deferred_delay}s "
+                          f"(round {retry_round} of {deferred_rounds}).")
+                    time.sleep(deferred_delay)
+                    pending = iter(_work_units(deferred, prompt_batch, compact))
+                    total, done, deferred = len(deferred), 0, []
+                    continue
+                break
+
+            unit, future, submitted = in_flight.popleft()
+            names = ', '.join(func_name for func_name, _ in unit)
+            remaining = max(0.0, task_timeout - (time.monotonic() - submitted))
+            done += len(unit)
+            try:
+                analyses = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                stats['skipped'] += len(unit)
+                print(f"[{done}/{total}] Timed out after {task_timeout}s analyzing {names}, skipping.")
+                continue
+            except ModelUnavailable as e:
+                deferred.extend(unit)
+                print(f"[{done}/{total}] Deferring {names}: {e}")
+                continue
+            except Exception as e:
+                stats['skipped'] += len(unit)
+                print(f"[{done}/{total}] Error analyzing {names}: {e}")
+                continue
+
+            for func_name, func_code in unit:
+                test_analysis = analyses.get(func_name)
+                if test_analysis:
+                    # Blocks while the writer is behind, which throttles new submissions
+                    write_queue.put((func_name, annotate_document(test_analysis, func_code,
+                                                                  file_paths.get(func_name))))
+                    print(f"[{done}/{total}] Analyzed {func_name} ({time.monotonic() - start:.1f}s elapsed)")
+                else:
+                    stats['skipped'] += 1
+                    print(f"[{done}/{total}] Skipping function {func_name} due to missing analysis output.")
+        for func_name, func_code in deferred:
+            document = unavailable_fallback(func_name, func_code)
+            write_queue.put((func_name, annotate_document(document, func_code, file_paths.get(func_name))))
+    finally:
+        # Requests still running past their timeout end on their own, so don't wait for them here
+        executor.shutdown(wait=False, cancel_futures=True)
+        write_queue.put(None)
+        writer_thread.join()
+
+    stats['stored'] = writer.stored
+    stats['failed'] = writer.failed
+
+    print(f"Stored {stats['stored']} documents, {stats['failed']} failed, {stats['skipped']} skipped "
+          f"in {time.monotonic() - start:.1f}s.")
+    return stats
+
+
+def analyze_sequentially(store, test_functions, cache=None, batch_size=50, flush_interval=5.0, file_paths=None,
+                         analysis_options=None, on_result=None, deferred_rounds=2, deferred_delay=30.0,
+                         prompt_batch=None):
+    """Analyze test functions one request at a time and store the results in batches.
+
+    Functions that fail with ModelUnavailable are retried after the others,
+    and ``prompt_batch`` packs small functions into shared requests, as in
+    analyze_concurrently.
+    """
+    file_paths = {} if file_paths is None else file_paths
+    analysis_options = analysis_options or {}
+    compact = analysis_options.get('compact', True)
+    writer = BatchWriter(store, batch_size=batch_size, flush_interval=flush_interval, on_result=on_result)
+    skipped = 0
+    pending = _items(test_functions)
+    for retry_round in range(deferred_rounds + 1):
+        deferred = []
+        for unit in _work_units(pending, prompt_batch, compact):
+            names = ', '.join(func_name for func_name, _ in unit)
+            print(f"\nProcessing test function: {names}")
+
+            try:
+                analyses = _analyze_unit(unit, cache, analysis_options)
+            except ModelUnavailable as e:
+                deferred.extend(unit)
+                print(f"Deferring {names}: {e}")
+                continue
+            
+            for func_name, func_code in unit:
+                test_analysis = analyses.get(func_name)
+                if test_analysis:
+                    writer.add(func_name, annotate_document(test_analysis, func_code, file_paths.get(func_name)))
+                else:
+                    skipped += 1
+                    print(f"Skipping function {func_name} due to missing analysis output.")
+        if not deferred or retry_round == deferred_rounds:
+            break
+        print(f"Retrying {len(deferred)} deferred functions in {deferred_delay}s "
+              f"(round {retry_round + 1} of {deferred_rounds}).")
+        writer.flush()
+        time.sleep(deferred_delay)
+        pending = deferred
+    for func_name, func_code in deferred:
+        writer.add(func_name, annotate_document(unavailable_fallback(func_name, func_code), func_code,
+                                                file_paths.get(func_name)))
+    writer.close()
+    return {'stored': writer.stored, 'failed': writer.failed, 'skipped': skipped}
+
+
+def analyze_static_only(store, test_functions, batch_size=50, flush_interval=5.0, file_paths=None, on_result=None):
+    """Store documents built from static analysis alone, without calling the model."""
+    file_paths = {} if file_paths is None else file_paths
+    writer = BatchWriter(store, batch_size=batch_size, flush_interval=flush_interval, on_result=on_result)
+    for func_name, func_code in _items(test_functions):
+        document = static_document(func_name, analyze_function(func_name, func_code))
+        writer.add(func_name, annotate_document(document, func_code, file_paths.get(func_name)))
+    writer.close()
+    print(f"Stored {writer.stored} static analyses, {writer.failed} failed.")
+    return {'stored': writer.stored, 'failed': writer.failed, 'skipped': 0}
+
+
+def store_derived_variants(store, clusters, test_functions, batch_size=50, flush_interval=5.0, file_paths=None,
+                           on_result=None):
+    """Store an analysis for every near-duplicate, derived from its cluster representative's stored document."""
+    file_paths = {} if file_paths is None else file_paths
+    writer = BatchWriter(store, batch_size=batch_size, flush_interval=flush_interval, on_result=on_result)
+    for cluster in clusters:
+        representative = cluster[0]
+        if len(cluster) < 2:
+            continue
+        document = store.get(representative)
+        if document is None:
+            print(f"No stored analysis for {representative}; skipping {len(cluster) - 1} near-duplicates.")
+            continue
+        for variant in cluster[1:]:
+            derived = derive_variant(representative, test_functions[representative], document,
+                                     variant, test_functions[variant])
+            writer.add(variant, annotate_document(derived, test_functions[variant], file_paths.get(variant)))
+    writer.close()
+    print(f"Stored {writer.stored} derived analyses, {writer.failed} failed.")
+    return {'stored': writer.stored, 'failed': writer.failed, 'skipped': 0}
+
+
+def select_for_enrichment(store, test_functions):
+    """Keep only the functions with no stored document or a low-confidence static one."""
+    selected = {}
+    total = 0
+    for func_name, func_code in _items(test_functions):
+        total += 1
+        document = store.get(func_name)
+        if document is None or is_low_confidence(document):
+            selected[func_name] = func_code
+    print(f"{len(selected)} of {total} test functions need a model analysis.")
+    return selected
@@ -0,0 +1,134 @@
+import ast
+import io
+import re
+import textwrap
+import tokenize
+
+# Runs of at least this many consecutive lines with the same shape are collapsed
+REPEAT_THRESHOLD = 3
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_STRING_PATTERN = re.compile(r"([rbuf]*)('''.*?'''|\"\"\".*?\"\"\"|'[^'\n]*'|\"[^\"\n]*\")", re.IGNORECASE | re.DOTALL)
+_NUMBER_PATTERN = re.compile(r"\b\d+(\.\d+)?\b")
+
+
+def count_tokens(text):
+    """Approximate the model token count of code as the number of words and punctuation marks.
+
+    This slightly overestimates BPE tokenizers on identifiers, which is the safe
+    direction for a budget check, and needs no tokenizer download.
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def strip_comments(code):
+    """Remove comments and blank lines, leaving strings that contain '#' untouched."""
+    lines = code.split('\n')
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT:
+                row, col = tok.start
+                lines[row - 1] = lines[row - 1][:col]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return '\n'.join(line.rstrip() for line in lines if line.strip())
+
+
+def _shape(line):
+    """A line with its literals blanked, so calls differing only in arguments compare equal."""
+    return _NUMBER_PATTERN.sub('0', _STRING_PATTERN.sub(r'\1""', line))
+
+
+def collapse_repeats(code, threshold=REPEAT_THRESHOLD):
+    """Replace runs of same-shape lines with the first line and a count of the rest."""
+    lines = code.split('\n')
+    output = []
+    i = 0
+    while i < len(lines):
+        j = i + 1
+        while j < len(lines) and _shape(lines[j]) == _shape(lines[i]):
+            j += 1
+        output.append(lines[i])
+        if j - i >= threshold:
+            indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+            output.append(f"{indent}# ... {j - i - 1} more similar lines with different arguments")
+        else:
+            output.extend(lines[i + 1:j])
+        i = j
+    return '\n'.join(output)
+
+
+def compact_source(code):
+    """Shrink function source for the prompt: no comments, no blank lines, repeats collapsed."""
+    return collapse_repeats(strip_comments(textwrap.dedent(code)))
+
+
+def chunk_function(code, token_budget):
+    """Split a function into pieces of at most token_budget tokens at statement boundaries.
+
+    Every chunk repeats the function signature so it reads as a function on
+    its own. A single statement larger than the budget becomes its own chunk.
+    Code that does not parse is split by lines instead.
+    """
+    if count_tokens(code) <= token_budget:
+        return [code]
+    lines = code.split('\n')
+    try:
+        function = ast.parse(code).body[0]
+        body_start = function.body[0].lineno
+        header = '\n'.join(lines[:body_start - 1])
+        statements = ['\n'.join(lines[stmt.lineno - 1:stmt.end_lineno]) for stmt in function.body]
+    except (SyntaxError, ValueError, IndexError, AttributeError):
+        header, statements = lines[0], lines[1:]
+
+    budget = max(token_budget - count_tokens(header), 1)
+    chunks, current, current_tokens = [], [], 0
+    for statement in statements:
+        tokens = count_tokens(statement)
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(statement)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return [header + '\n' + '\n'.join(chunk) for chunk in chunks]
+
+
+def pack_batches(items, token_budget, max_functions=8, size=count_tokens):
+    """Group (name, code) pairs into batches for one prompt each.
+
+    Functions are packed in order until the next one would take the batch past
+    ``token_budget`` tokens, as measured by ``size``, or the batch holds
+    ``max_functions``. A function over half the budget is not worth batching
+    and is yielded on its own. Yields lists of (name, code) pairs.
+    """
+    batch, batch_tokens = [], 0
+    for name, code in items:
+        tokens = size(code)
+        if tokens > token_budget // 2:
+            yield [(name, code)]
+            continue
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_functions):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append((name, code))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def merge_analyses(documents):
+    """Merge the analyses of a function's chunks, in order, into one document body."""
+    tests = [document["test"] for document in documents]
+    steps = []
+    for test in tests:
+        for step in test.get("steps", []):
+            if not steps or steps[-1] != step:
+                steps.append(step)
+    return {
+        "description": tests[0].get("description", ""),
+        "steps": steps,
+        "functions_dependencies": list(dict.fromkeys(
+            dependency for test in tests for dependency in test.get("functions_dependencies", []))),
+        "usage": tests[0].get("usage", ""),
+    }
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+
+from . import metrics
+
+
+class ModelUnavailable(Exception):
+    """Raised when the model server keeps failing or the circuit breaker is open.
+
+    Callers should defer the work and try again later rather than fall back
+    to a heuristic analysis straight away.
+    """
+
+
+def is_retryable(error):
+    """Server overload and connection problems are retried; request errors such as an unknown model are not."""
+    import ollama
+
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code == 429 or not 400 <= error.status_code < 500
+    return True
+
+
+class CircuitBreaker:
+    """Stop sending requests after ``failure_threshold`` consecutive failures.
+
+    The breaker stays open for ``reset_timeout`` seconds, then lets a single
+    probe request through. A successful probe closes it again; a failed one
+    re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print("Model server recovered, closing the circuit breaker.")
+            self.state, self.failures, self._probing = 'closed', 0, False
+
+    def record_ignored(self):
+        """A request failed for a reason unrelated to server health; neither trip nor close the breaker."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                if self.state == 'closed':
+                    print(f"{self.failures} consecutive model failures, opening the circuit breaker "
+                          f"for {self.reset_timeout}s.")
+                    metrics.increment('circuit_opened')
+                self.state, self._opened_at = 'open', time.monotonic()
+
+
+class AdaptiveLimiter:
+    """Cap concurrent model requests with additive-increase, multiplicative-decrease.
+
+    Each success raises the limit by about one request per window of ``limit``
+    requests. An error, or a response slower than ``target_latency`` seconds,
+    multiplies it by ``decrease``. Only requests sent after the last decrease
+    can trigger another, so a burst of failures from one overloaded moment
+    cuts the limit once.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=None, target_latency=None, decrease=0.5):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.limit = float(max(minimum, min(initial, self.maximum)))
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot and return the time the request was let through."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, ok=None):
+        """Free the slot; ``ok`` None means the outcome says nothing about server load."""
+        latency = time.monotonic() - started
+        with self._condition:
+            self.in_flight -= 1
+            if ok is None:
+                pass
+            elif ok and (self.target_latency is None or latency <= self.target_latency):
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif started >= self._last_decrease and self.limit > self.minimum:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self._last_decrease = time.monotonic()
+                print(f"Model server {'slow' if ok else 'failing'}, lowering concurrency to {int(self.limit)}.")
+            self._condition.notify_all()
+
+
+class ResilientClient:
+    """Run model requests under an adaptive limiter and a circuit breaker, with jittered retries.
+
+    A retryable failure is tried again after a random delay of up to
+    ``base_delay * 2 ** attempt`` seconds (capped at ``max_delay``). After
+    ``max_retries`` retries, or as soon as the breaker is open, ModelUnavailable
+    is raised so the caller can defer the work instead of waiting here.
+    """
+
+    def __init__(self, limiter=None, breaker=None, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.limiter = limiter or AdaptiveLimiter(initial=1)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, request, deadline=None):
+        """Return ``request()``, retrying it as described above.
+
+        No retry is started after the ``time.monotonic()`` value ``deadline``,
+        so a worker whose task has timed out is not held by further attempts.
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise ModelUnavailable(f"Task deadline passed after {attempt} attempts: {last_error}")
+                metrics.increment('model_retries')
+                time.sleep(delay)
+            if not self.breaker.allow():
+                raise ModelUnavailable("circuit breaker is open")
+            started = self.limiter.acquire()
+            try:
+                result = request()
+            except Exception as e:
+                if not is_retryable(e):
+                    self.limiter.release(started)
+                    self.breaker.record_ignored()
+                    raise
+                self.limiter.release(started, ok=False)
+                self.breaker.record_failure()
+                last_error = e
+                print(f"Model request failed (attempt {attempt + 1} of {self.max_retries + 1}): {e}")
+                continue
+            self.limiter.release(started, ok=True)
+            self.breaker.record_success()
+            return result
+        raise ModelUnavailable(f"Model request failed after {self.max_retries + 1} attempts: {last_error}")
@@ -0,0 +1,177 @@
+import ast
+import io
+import re
+import textwrap
+import tokenize
+
+# Calls that say nothing about what a test depends on
+BUILTINS = {
+    'print', 'len', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple', 'min', 'max',
+    'range', 'enumerate', 'zip', 'map', 'filter', 'sorted', 'reversed', 'any', 'all', 'sum',
+}
+SETUP_PREFIXES = ('setup', 'setUp', 'initialize', 'init', 'create', 'load', 'prepare')
+CLEANUP_PREFIXES = ('tearDown', 'cleanup', 'clean_up', 'delete', 'remove')
+NON_STEP_CALLS = ('setUp', 'tearDown', 'fail')
+MAX_STEP_CALLS = 5
+
+
+class _FunctionVisitor(ast.NodeVisitor):
+    """Collect calls and assertions of a function in one walk over its AST."""
+
+    def __init__(self):
+        self.calls = []
+        self.assertions = []
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.calls.append((func.end_lineno, func.end_col_offset, func.id, False))
+        elif isinstance(func, ast.Attribute):
+            is_self = isinstance(func.value, ast.Name) and func.value.id == 'self'
+            self.calls.append((func.end_lineno, func.end_col_offset, func.attr, is_self))
+            if is_self and func.attr.startswith('assert'):
+                self.assertions.append((node.lineno, node.col_offset, f"self.{func.attr}"))
+        self.generic_visit(node)
+
+    def visit_Assert(self, node):
+        self.assertions.append((node.lineno, node.col_offset, ast.unparse(node.test)))
+        self.generic_visit(node)
+
+
+def _comments(code):
+    """Return the text of every comment in the code, in order."""
+    try:
+        return [tok.string.lstrip('#').strip()
+                for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+                if tok.type == tokenize.COMMENT]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return re.findall(r'#\s*(.*?)$', code, re.MULTILINE)
+
+
+def _regex_scan(code):
+    """Approximate the AST walk with regexes for code that does not parse."""
+    calls = []
+    for match in re.finditer(r'(self\.)?([a-zA-Z_][a-zA-Z0-9_]*)\(', code):
+        calls.append((match.start(), 0, match.group(2), bool(match.group(1))))
+    assertions = [(m.start(), 0, m.group(1).strip())
+                  for m in re.finditer(r'(?<![\w.])assert\s+([^,;\n]+)', code)]
+    assertions += [(m.start(), 0, m.group(0)[:-1].strip())
+                   for m in re.finditer(r'self\.assert[A-Za-z]*\s*\(', code)]
+    return calls, sorted(assertions)
+
+
+def _unique(names):
+    return list(dict.fromkeys(names))
+
+
+def analyze_function(function_name, function_code):
+    """Statically analyze a test function in a single pass.
+
+    Returns a dict with the ordered ``calls`` and ``self_calls``, the
+    de-duplicated ``dependencies``, ``assertions``, ``setup_calls``,
+    ``cleanup_calls``, ``comments`` and a ``steps`` skeleton.
+    """
+    code = textwrap.dedent(function_code)
+    try:
+        visitor = _FunctionVisitor()
+        visitor.visit(ast.parse(code))
+        raw_calls, assertions = sorted(visitor.calls), sorted(visitor.assertions)
+    except (SyntaxError, ValueError):
+        raw_calls, assertions = _regex_scan(code)
+
+    calls = [name for _, _, name, _ in raw_calls]
+    self_calls = [name for _, _, name, is_self in raw_calls if is_self]
+    own_name = function_name.rsplit('.', 1)[-1]
+    dependencies = _unique(
+        name for name in calls
+        if name not in BUILTINS
+        and not name.startswith('__')
+        and name != own_name
+        and name != own_name.replace('test_', '', 1)
+    )
+    setup_calls = _unique(name for name in self_calls if name.startswith(SETUP_PREFIXES))
+    cleanup_calls = _unique(name for name in self_calls if name.startswith(CLEANUP_PREFIXES))
+    main_calls = [name for name in self_calls
+                  if name not in NON_STEP_CALLS
+                  and not name.startswith('assert')
+                  and name not in setup_calls
+                  and name not in cleanup_calls]
+
+    steps = []
+    if setup_calls:
+        steps.append(f"Initialize test by calling {', '.join(setup_calls)}.")
+    else:
+        steps.append("Set up test prerequisites and environment.")
+    for name in main_calls[:MAX_STEP_CALLS]:
+        steps.append(f"Execute {name.replace('_', ' ')}.")
+    if assertions:
+        steps.append(f"Verify results using {len(assertions)} assertions.")
+    if cleanup_calls:
+        steps.append(f"Clean up resources by calling {', '.join(cleanup_calls)}.")
+
+    return {
+        "name": function_name,
+        "calls": calls,
+        "self_calls": self_calls,
+        "dependencies": dependencies,
+        "assertions": [text for _, _, text in assertions],
+        "setup_calls": setup_calls,
+        "cleanup_calls": cleanup_calls,
+        "comments": _comments(code),
+        "steps": steps,
+    }
+
+
+def _purpose(function_name):
+    return function_name.rsplit('.', 1)[-1].replace('test_', '', 1).replace('_', ' ')
+
+
+def static_description(function_name, analysis):
+    asserts = [text for text in analysis["assertions"] if not text.startswith('self.')]
+    if asserts:
+        return f"This test verifies {_purpose(function_name)} by asserting {', '.join(asserts[:2])}."
+    return f"This test verifies the behavior of {_purpose(function_name)}."
+
+
+def static_usage(function_name, analysis):
+    if analysis["comments"]:
+        return f"This test is used to {analysis['comments'][0].lower()}."
+    return f"This test ensures correct behavior when {_purpose(function_name)}."
+
+
+def static_document(function_name, analysis):
+    """Build a complete analysis document from the static analysis alone.
+
+    The document is marked as a low-confidence static analysis so that a later
+    model pass can find and enrich it.
+    """
+    return {
+        "test": {
+            "description": static_description(function_name, analysis),
+            "steps": list(analysis["steps"]),
+            "functions_dependencies": list(analysis["dependencies"]),
+            "usage": static_usage(function_name, analysis),
+        },
+        "meta": {"analysis": "static", "confidence": "low"},
+    }
+
+
+def is_low_confidence(document):
+    """Return True for documents that came from static analysis rather than the model."""
+    return document.get("meta", {}).get("confidence", "low") == "low"
+
+
+def summarize(analysis):
+    """Render the static analysis as a compact text summary for the model prompt."""
+    lines = [f"Function: {analysis['name']}"]
+    if analysis["calls"]:
+        lines.append(f"Calls in order: {', '.join(analysis['calls'])}")
+    if analysis["setup_calls"]:
+        lines.append(f"Setup calls: {', '.join(analysis['setup_calls'])}")
+    if analysis["assertions"]:
+        lines.append(f"Assertions: {'; '.join(analysis['assertions'])}")
+    if analysis["cleanup_calls"]:
+        lines.append(f"Cleanup calls: {', '.join(analysis['cleanup_calls'])}")
+    if analysis["comments"]:
+        lines.append(f"Comments: {'; '.join(analysis['comments'])}")
+    return '\n'.join(lines)
@@ -0,0 +1,61 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """Stand-in for an Ollama server: /api/tags lists the server's models, /api/chat asks its reply function.
+
+    ``reply(request)`` returns ``(status, text)``; a 200 becomes a chat response
+    with text as the message content, anything else an Ollama error body.
+    """
+
+    def do_GET(self):
+        self._send(200, {"models": [{"model": model, "name": model} for model in self.server.models]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self.server.requests.append(request)
+        status, text = self.server.reply(request)
+        if status != 200:
+            self._send(status, {"error": text})
+        elif request.get('stream'):
+            self._send(200, {"model": request["model"], "message": {"role": "assistant", "content": text},
+                             "done": True}, content_type='application/x-ndjson')
+        else:
+            self._send(200, {"model": request["model"], "created_at": "2024-01-01T00:00:00Z", "done": True,
+                             "message": {"role": "assistant", "content": text}})
+
+    def _send(self, status, body, content_type='application/json'):
+        data = (json.dumps(body) + '\n').encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_stub():
+    """Start stub Ollama servers: ``ollama_stub(reply, models=())`` returns one with ``host`` and ``requests``."""
+    servers = []
+
+    def start(reply, models=()):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubOllamaHandler)
+        server.reply = reply
+        server.models = list(models)
+        server.requests = []
+        server.host = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
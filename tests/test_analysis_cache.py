@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from testindex import analysis_cache
+from testindex.analysis_cache import AnalysisCache, cache_key
+
+
+def test_hits_and_misses(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'cache.sqlite'))
+    key = cache_key("def test_a():\n    pass\n", 'qwq', 3)
+
+    assert cache.get(key) is None
+    cache.put(key, {"test": {"description": "d"}})
+
+    assert cache.get(key) == {"test": {"description": "d"}}
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_formatting_only_edits_share_a_key():
+    assert cache_key("def test_a():\n    pass\n", 'qwq', 3) == cache_key("def test_a():\r\n\tpass  \n\n", 'qwq', 3)
+    assert cache_key("def test_a():\n    pass\n", 'qwq', 3) != cache_key("def test_a():\n    pass\n", 'qwq', 4)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(analysis_cache, 'time', SimpleNamespace(time=lambda: next(clock)))
+    cache = AnalysisCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+
+    cache.put('a', {"n": 1})
+    cache.put('b', {"n": 2})
+    cache.get('a')
+    cache.put('c', {"n": 3})
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {"n": 1}
+    assert cache.get('c') == {"n": 3}
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = AnalysisCache(path)
+    cache.put('a', {"n": 1})
+    cache.close()
+
+    reopened = AnalysisCache(path)
+    assert reopened.get('a') == {"n": 1}
+    reopened.close()
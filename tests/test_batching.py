@@ -0,0 +1,36 @@
+import json
+
+from testindex.analysis import analyze_batch
+from testindex.model_router import ModelRouter
+
+
+def _analysis(name):
+    return {
+        "function": name,
+        "description": f"Checks {name}.",
+        "steps": ["Call it.", "Verify the result."],
+        "functions_dependencies": [],
+        "usage": "Run it with the suite.",
+    }
+
+
+def test_missing_and_malformed_entries_are_analyzed_on_their_own(ollama_stub):
+    def reply(request):
+        prompt = request['messages'][0]['content']
+        if 'JSON array' in prompt:
+            # Drop test_c and return a malformed entry for test_b
+            return 200, json.dumps([_analysis('m.test_a'), {"function": "m.test_b", "steps": "none"}])
+        name = next(name for name in ('m.test_a', 'm.test_b', 'm.test_c') if name.rsplit('.', 1)[-1] in prompt)
+        return 200, json.dumps(_analysis(name))
+
+    server = ollama_stub(reply)
+    router = ModelRouter([server.host], ['m'])
+    functions = [(f"m.test_{letter}", f"def test_{letter}(self):\n    self.check_{letter}()\n") for letter in 'abc']
+
+    documents = analyze_batch(functions, router=router)
+
+    assert sorted(documents) == ['m.test_a', 'm.test_b', 'm.test_c']
+    assert len(server.requests) == 3
+    assert documents['m.test_a']["meta"]["batched"] == 3
+    assert "batched" not in documents['m.test_b']["meta"]
+    assert documents['m.test_c']["test"]["description"] == "Checks m.test_c."
@@ -0,0 +1,57 @@
+import json
+
+from testindex.analysis_cache import source_hash
+from testindex.checkpoint import Checkpoint, in_shard, shard_journal_path
+
+CODE = "def test_a(self):\n    self.check()\n"
+
+
+def test_completed_functions_are_skipped_until_their_source_changes(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    checkpoint = Checkpoint(path)
+    checkpoint.on_result('m.test_a', {"meta": {"source_hash": source_hash(CODE)}}, None)
+    checkpoint.on_result('m.test_b', {"meta": {"source_hash": source_hash(CODE)}}, RuntimeError("write failed"))
+    checkpoint.close()
+
+    restarted = Checkpoint(path)
+    edited = CODE.replace('check', 'check_more')
+    pending = list(restarted.pending([('m.test_a', CODE), ('m.test_b', CODE), ('m.test_c', CODE)]))
+    redo = list(restarted.pending([('m.test_a', edited)]))
+    restarted.close()
+
+    assert pending == [('m.test_b', CODE), ('m.test_c', CODE)]
+    assert restarted.skipped == 1
+    assert redo == [('m.test_a', edited)]
+
+
+def test_partial_last_line_is_ignored_and_appends_start_on_a_new_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    complete = json.dumps({"function": "m.test_a", "source_hash": source_hash(CODE), "doc_id": "m.test_a"})
+    path.write_text(complete + '\n{"function": "m.test_b", "sour')
+
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.completed == {"m.test_a": source_hash(CODE)}
+    checkpoint.record('m.test_c', source_hash(CODE), 'm.test_c')
+    checkpoint.close()
+
+    lines = path.read_text().splitlines()
+    assert lines[1] == '{"function": "m.test_b", "sour'
+    assert json.loads(lines[2])["function"] == 'm.test_c'
+    reopened = Checkpoint(str(path))
+    reopened.close()
+    assert set(reopened.completed) == {'m.test_a', 'm.test_c'}
+
+
+def test_shards_partition_the_functions():
+    names = [f"m.test_{i}" for i in range(200)]
+
+    shards = [[name for name in names if in_shard(name, index, 3)] for index in range(3)]
+
+    assert sorted(sum(shards, [])) == sorted(names)
+    assert all(shards)
+    assert all(in_shard(name, 0, 1) for name in names)
+
+
+def test_shard_journal_path():
+    assert shard_journal_path('runs/checkpoint.jsonl', 1, 4) == 'runs/checkpoint.2-of-4.jsonl'
+    assert shard_journal_path('checkpoint.jsonl', 0, 1) == 'checkpoint.jsonl'
@@ -0,0 +1,49 @@
+import pytest
+import yaml
+
+from testindex import converter
+
+DOCUMENTS = {
+    'attributes_and_text': '<r><b k="v">t</b></r>',
+    'mixed_root_text': '<r>text<a>1</a></r>',
+    'text_only_root': '<r>hello</r>',
+    'empty_root': '<r/>',
+    'root_attributes': '<r x="1" y="2"><a>1</a><a>2</a><a>3</a><b/><c q="1"><d>x</d>tail</c>end</r>',
+    'several_top_level_elements': '<a>1</a><b k="2">x</b>',
+    'declaration_and_prefixes': '<?xml version="1.0"?>\n<r xmlns:n="u"><n:a n:x="1">v</n:a><!-- c --></r>',
+    'long_and_unicode_text': f'<r><a>{"wrapped words " * 20}</a><b>café ✓</b><b/></r>',
+}
+
+
+@pytest.mark.parametrize('xml', DOCUMENTS.values(), ids=DOCUMENTS.keys())
+def test_streaming_output_matches_in_memory_conversion(tmp_path, monkeypatch, xml):
+    # Small chunks so elements and the wrapped root are split across reads
+    monkeypatch.setattr(converter, 'CHUNK_SIZE', 7)
+    input_file = tmp_path / 'input.xml'
+    input_file.write_text(xml)
+
+    expected = tmp_path / 'input.yaml'
+    assert converter.xml_to_yaml(str(input_file)) == str(expected)
+    streamed = converter.xml_to_yaml_streaming(str(input_file), str(tmp_path / 'streamed.yaml'))
+
+    assert open(streamed).read() == expected.read_text()
+
+
+def test_streaming_rejects_separated_siblings(tmp_path):
+    input_file = tmp_path / 'input.xml'
+    input_file.write_text('<r><a>1</a><b>2</b><a>3</a></r>')
+
+    with pytest.raises(converter.StreamingUnsupported):
+        converter.xml_to_yaml_streaming(str(input_file), str(tmp_path / 'streamed.yaml'))
+    assert not (tmp_path / 'streamed.yaml').exists()
+    assert not (tmp_path / 'streamed.yaml.tmp').exists()
+
+
+def test_large_files_fall_back_to_in_memory_conversion(tmp_path, monkeypatch):
+    monkeypatch.setattr(converter, 'STREAMING_THRESHOLD', 0)
+    input_file = tmp_path / 'input.xml'
+    input_file.write_text('<r><a>1</a><b>2</b><a>3</a></r>')
+
+    output_file = converter.xml_to_yaml(str(input_file))
+
+    assert yaml.safe_load(open(output_file)) == {'r': {'a': ['1', '3'], 'b': '2'}}
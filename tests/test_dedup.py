@@ -0,0 +1,29 @@
+from testindex.dedup import derive_variant
+
+DOCUMENT = {
+    "test": {
+        "description": "Checks that add stores the address while adding items.",
+        "steps": ["Call add.", "Verify the address."],
+        "functions_dependencies": ["add"],
+        "usage": "This test ensures correct behavior when add item.",
+    },
+    "meta": {"analysis": "llm", "confidence": "high"},
+}
+
+
+def test_renames_only_whole_words():
+    derived = derive_variant("m.test_add_item", "def test_add_item(self):\n    self.add(1)\n", DOCUMENT,
+                             "m.test_remove_item", "def test_remove_item(self):\n    self.remove(1)\n")
+
+    assert derived["test"]["description"] == "Checks that remove stores the address while adding items."
+    assert derived["test"]["steps"] == ["Call remove.", "Verify the address."]
+    assert derived["test"]["usage"] == "This test ensures correct behavior when remove item."
+    assert derived["test"]["functions_dependencies"] == ["remove"]
+
+
+def test_empty_purpose_does_not_rewrite_text():
+    derived = derive_variant("m.test_", "def test_(self):\n    self.add(1)\n", DOCUMENT,
+                             "m.test_other", "def test_other(self):\n    self.add(1)\n")
+
+    assert derived["test"]["description"] == DOCUMENT["test"]["description"]
+    assert derived["test"]["steps"] == DOCUMENT["test"]["steps"]
@@ -0,0 +1,23 @@
+from testindex.document_store import get_collection
+
+
+class _Cluster:
+    def __init__(self):
+        self.opened = []
+
+    def bucket(self, name):
+        self.opened.append(name)
+        return self
+
+    def default_collection(self):
+        return object()
+
+
+def test_collection_handles_are_cached_per_cluster():
+    first, second = _Cluster(), _Cluster()
+    handle = get_collection(first, 'tests')
+    assert get_collection(first, 'tests') is handle
+    assert get_collection(second, 'tests') is not handle
+    get_collection(first, 'other')
+    assert first.opened == ['tests', 'other']
+    assert second.opened == ['tests']
@@ -0,0 +1,19 @@
+from testindex.pipeline import crawl_test_functions, extract_test_functions
+
+SOURCE = "def test_basic(self):\n    self.check()\n\n\nclass TestFoo:\n    def test_basic(self):\n        pass\n"
+
+
+def test_same_names_in_different_modules_are_kept_apart(tmp_path):
+    for package in ('a', 'b'):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / 'test_mod.py').write_text(SOURCE)
+
+    extracted_paths, crawled_paths = {}, {}
+    extracted = extract_test_functions(str(tmp_path), extracted_paths, root=str(tmp_path))
+    crawled = dict(crawl_test_functions(str(tmp_path), crawled_paths, processes=1, root=str(tmp_path)))
+
+    assert sorted(extracted) == ['a.test_mod.TestFoo.test_basic', 'a.test_mod.test_basic',
+                                 'b.test_mod.TestFoo.test_basic', 'b.test_mod.test_basic']
+    assert crawled == extracted
+    assert extracted_paths == crawled_paths
+    assert extracted_paths['b.test_mod.test_basic'] == 'b/test_mod.py'
@@ -0,0 +1,31 @@
+import subprocess
+
+from testindex.document_store import SQLiteStore
+from testindex.incremental import changed_files, plan_incremental
+
+
+def _git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_root_below_the_top_level_of_the_work_tree(tmp_path):
+    package = tmp_path / 'pkg'
+    (package / 'tests').mkdir(parents=True)
+    test_file = package / 'tests' / 'test_a.py'
+    test_file.write_text("def test_a(self):\n    self.check()\n")
+    (tmp_path / 'test_outside.py').write_text("def test_outside(self):\n    pass\n")
+    _git(tmp_path, 'init', '-q')
+    _git(tmp_path, 'add', '.')
+    _git(tmp_path, '-c', 'user.name=t', '-c', 'user.email=t@example.com', 'commit', '-q', '-m', 'base')
+    test_file.write_text("def test_a(self):\n    self.check_more()\n\ndef test_b(self):\n    pass\n")
+    (tmp_path / 'test_outside.py').write_text("def test_outside(self):\n    self.changed()\n")
+
+    files = changed_files('HEAD', str(package))
+    store = SQLiteStore(str(tmp_path / 'store.sqlite'))
+    test_functions, file_paths, stale_ids = plan_incremental(store, files, str(package))
+    store.close()
+
+    assert files == ['tests/test_a.py']
+    assert sorted(test_functions) == ['tests.test_a.test_a', 'tests.test_a.test_b']
+    assert file_paths['tests.test_a.test_b'] == 'tests/test_a.py'
+    assert stale_ids == []
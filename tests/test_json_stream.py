@@ -0,0 +1,75 @@
+import json
+
+from testindex.json_stream import JsonObjectScanner
+
+ANSWER = {
+    "description": "Checks {braces} and \"quotes\" in strings.",
+    "steps": ["Create it.", "Verify it."],
+    "functions_dependencies": ["create"],
+    "usage": "Run it.",
+}
+SKETCH = dict(ANSWER, description="A sketch made while reasoning.")
+
+
+def feed_in_chunks(scanner, text, size=3):
+    """Feed text a few characters at a time; return the first object found and how much was fed."""
+    for start in range(0, len(text), size):
+        found = scanner.feed(text[start:start + size])
+        if found is not None:
+            return found, start + size
+    return None, len(text)
+
+
+def test_returns_the_object_as_soon_as_it_is_complete():
+    text = "Sure, here it is:\n```json\n" + json.dumps(ANSWER) + "\n```\nAnything else?" * 20
+
+    found, fed = feed_in_chunks(JsonObjectScanner(), text)
+
+    assert found == ANSWER
+    assert fed < len(text) - 100
+
+
+def test_accepts_a_test_wrapper_and_skips_incomplete_objects():
+    text = json.dumps({"note": "partial", "steps": []}) + json.dumps({"test": ANSWER})
+
+    found, _ = feed_in_chunks(JsonObjectScanner(), text)
+
+    assert found in (ANSWER, {"test": ANSWER})
+
+
+def test_stray_brace_in_prose_does_not_hide_the_answer():
+    scanner = JsonObjectScanner()
+
+    assert scanner.feed('Here is a dict { of stuff. ') is None
+    assert scanner.feed(json.dumps(ANSWER)) == ANSWER
+
+
+def test_think_block_after_other_text_is_skipped():
+    text = "Let me see. <think>maybe " + json.dumps(SKETCH) + "</think>\n" + json.dumps(ANSWER)
+
+    found, _ = feed_in_chunks(JsonObjectScanner(), text)
+
+    assert found == ANSWER
+
+
+def test_think_tags_split_across_chunks():
+    text = "<think>" + json.dumps(SKETCH) + "</think>" + json.dumps(ANSWER)
+
+    for size in (1, 2, 5):
+        found, _ = feed_in_chunks(JsonObjectScanner(), text, size=size)
+        assert found == ANSWER
+
+
+def test_reasoning_model_output_is_ignored_until_the_block_closes():
+    text = "First I sketch " + json.dumps(SKETCH) + " then answer.</think>" + json.dumps(ANSWER)
+
+    found, _ = feed_in_chunks(JsonObjectScanner(reasoning=True), text)
+
+    assert found == ANSWER
+
+
+def test_reasoning_without_a_closing_tag_finds_nothing():
+    scanner = JsonObjectScanner(reasoning=True)
+
+    assert feed_in_chunks(scanner, "thinking " + json.dumps(SKETCH))[0] is None
+    assert scanner.text.startswith("thinking")
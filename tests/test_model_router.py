@@ -0,0 +1,86 @@
+import json
+
+import ollama
+import pytest
+
+from testindex.analysis import get_test_analysis
+from testindex.model_router import ModelRouter
+from testindex.resilience import ResilientClient
+
+ANALYSIS = json.dumps({
+    "description": "Checks that a bucket can be created.",
+    "steps": ["Create the bucket.", "Verify it exists."],
+    "functions_dependencies": ["create_bucket"],
+    "usage": "Run it against a fresh cluster.",
+})
+SHORT_TEST = "def test_create(self):\n    self.create_bucket('b')\n    self.assertTrue(self.bucket_exists('b'))\n"
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_failed_backend_is_skipped(ollama_stub):
+    failing = ollama_stub(lambda request: (500, "overloaded"))
+    working = ollama_stub(lambda request: (200, "ok"))
+    router = ModelRouter([failing.host, working.host], ['m'])
+
+    assert router.chat('m', MESSAGES)['message']['content'] == 'ok'
+    assert router.chat('m', MESSAGES)['message']['content'] == 'ok'
+
+    assert len(failing.requests) == 1
+    assert len(working.requests) == 2
+    assert not router.backends[0].healthy
+
+
+def test_unknown_model_is_raised_without_marking_the_backend_unhealthy(ollama_stub):
+    server = ollama_stub(lambda request: (404, f"model '{request['model']}' not found"))
+    other = ollama_stub(lambda request: (200, "ok"))
+    router = ModelRouter([server.host, other.host], ['m'])
+    client = ResilientClient(max_retries=3, base_delay=0)
+
+    with pytest.raises(ollama.ResponseError) as error:
+        client.call(lambda: router.chat('m', MESSAGES))
+
+    assert error.value.status_code == 404
+    assert len(server.requests) == 1
+    assert other.requests == []
+    assert all(backend.healthy for backend in router.backends)
+
+
+def test_health_check_routes_around_backends_without_the_model(ollama_stub):
+    without = ollama_stub(lambda request: (200, "wrong host"), models=['other:latest'])
+    serving = ollama_stub(lambda request: (200, "ok"), models=['m:latest'])
+    router = ModelRouter([without.host, serving.host], ['m'])
+    router.check_health()
+
+    assert router.chat('m', MESSAGES)['message']['content'] == 'ok'
+    assert without.requests == []
+
+
+def test_short_function_starts_at_the_smallest_model_and_escalates(ollama_stub):
+    server = ollama_stub(lambda request: (200, ANALYSIS if request['model'] == 'large' else "no JSON here"))
+    router = ModelRouter([server.host], ['small', 'large'])
+
+    document = get_test_analysis('tests.test_bucket.test_create', SHORT_TEST, router=router)
+
+    assert [request['model'] for request in server.requests] == ['small', 'large']
+    assert document["meta"]["model"] == 'large'
+    assert document["test"]["description"] == "Checks that a bucket can be created."
+
+
+def test_long_function_goes_straight_to_the_largest_model(ollama_stub):
+    server = ollama_stub(lambda request: (200, ANALYSIS))
+    router = ModelRouter([server.host], ['small', 'large'], short_prompt_tokens=10)
+
+    get_test_analysis('tests.test_bucket.test_create', SHORT_TEST, router=router)
+
+    assert [request['model'] for request in server.requests] == ['large']
+
+
+def test_streamed_request_error_keeps_the_backend_healthy(ollama_stub):
+    server = ollama_stub(lambda request: (404, "model not found"))
+    router = ModelRouter([server.host], ['m'])
+
+    with pytest.raises(ollama.ResponseError):
+        list(router.chat('m', MESSAGES, stream=True))
+
+    assert router.backends[0].healthy
+    assert router.backends[0].outstanding == 0
@@ -0,0 +1,77 @@
+import json
+import time
+
+import pytest
+
+from testindex import analysis
+from testindex.document_store import SQLiteStore
+from testindex.pipeline import analyze_concurrently
+from testindex.resilience import ResilientClient
+
+ANALYSIS = json.dumps({
+    "description": "Checks the cluster.",
+    "steps": ["Call it.", "Verify the result."],
+    "functions_dependencies": [],
+    "usage": "Run it with the suite.",
+})
+
+
+@pytest.fixture
+def default_host(monkeypatch):
+    """Point the default Ollama client at a stub server."""
+    def use(server):
+        monkeypatch.setenv('OLLAMA_HOST', server.host)
+        analysis._ollama_client.cache_clear()
+
+    yield use
+    analysis._ollama_client.cache_clear()
+
+
+def test_hung_request_frees_its_worker(tmp_path, ollama_stub, default_host):
+    def reply(request):
+        if 'hang_here' in request['messages'][0]['content']:
+            time.sleep(3)
+        return 200, ANALYSIS
+
+    default_host(ollama_stub(reply))
+    store = SQLiteStore(str(tmp_path / 'store.sqlite'))
+    functions = {
+        'm.test_hung': "def test_hung(self):\n    self.hang_here()\n",
+        'm.test_one': "def test_one(self):\n    self.check_one()\n",
+        'm.test_two': "def test_two(self):\n    self.check_two()\n",
+    }
+
+    start = time.monotonic()
+    stats = analyze_concurrently(store, functions, max_workers=1, task_timeout=0.5, flush_interval=0.1)
+
+    assert time.monotonic() - start < 2.5
+    assert stats['skipped'] <= 1
+    assert store.get('m.test_one')["meta"]["analysis"] == 'llm'
+    assert store.get('m.test_two')["meta"]["analysis"] == 'llm'
+    store.close()
+
+
+def test_hung_request_frees_its_worker_with_a_resilient_client(tmp_path, ollama_stub, default_host):
+    def reply(request):
+        if 'hang_here' in request['messages'][0]['content']:
+            time.sleep(3)
+        return 200, ANALYSIS
+
+    default_host(ollama_stub(reply))
+    store = SQLiteStore(str(tmp_path / 'store.sqlite'))
+    functions = {
+        'm.test_hung': "def test_hung(self):\n    self.hang_here()\n",
+        'm.test_one': "def test_one(self):\n    self.check_one()\n",
+        'm.test_two': "def test_two(self):\n    self.check_two()\n",
+    }
+    client = ResilientClient(max_retries=4, base_delay=0.01)
+
+    start = time.monotonic()
+    stats = analyze_concurrently(store, functions, max_workers=1, task_timeout=0.5, flush_interval=0.1,
+                                 analysis_options={'client': client}, deferred_rounds=0)
+
+    assert time.monotonic() - start < 2.5
+    assert stats['skipped'] <= 1
+    assert store.get('m.test_one')["meta"]["analysis"] == 'llm'
+    assert store.get('m.test_two')["meta"]["analysis"] == 'llm'
+    store.close()
@@ -0,0 +1,122 @@
+import time
+
+import ollama
+import pytest
+
+from testindex.resilience import AdaptiveLimiter, CircuitBreaker, ModelUnavailable, ResilientClient
+
+
+def test_limiter_increases_additively_and_halves_on_failure():
+    limiter = AdaptiveLimiter(initial=4, maximum=8)
+    limiter.limit = 2.0
+
+    limiter.release(limiter.acquire(), ok=True)
+    assert limiter.limit == pytest.approx(2.5)
+
+    limiter.release(limiter.acquire(), ok=False)
+    assert limiter.limit == pytest.approx(1.25)
+
+
+def test_limiter_cuts_once_per_burst_of_failures():
+    limiter = AdaptiveLimiter(initial=8)
+    started = [limiter.acquire() for _ in range(3)]
+
+    for start in started:
+        limiter.release(start, ok=False)
+
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_limiter_treats_slow_responses_as_overload_and_ignores_unknown_outcomes():
+    limiter = AdaptiveLimiter(initial=4, target_latency=0.01)
+
+    limiter.release(limiter.acquire() - 1, ok=True)
+    assert limiter.limit == 2
+
+    limiter.release(limiter.acquire(), ok=None)
+    assert limiter.limit == 2
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_retries_until_the_request_succeeds():
+    client = ResilientClient(max_retries=3, base_delay=0)
+    outcomes = [ConnectionError("refused"), ConnectionError("refused"), "done"]
+
+    def request():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert client.call(request) == "done"
+    assert outcomes == []
+
+
+def test_request_errors_are_raised_without_retrying():
+    client = ResilientClient(max_retries=3, base_delay=0)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise ollama.ResponseError("model not found", 404)
+
+    with pytest.raises(ollama.ResponseError):
+        client.call(request)
+
+    assert len(calls) == 1
+    assert client.breaker.failures == 0
+
+
+def test_open_breaker_defers_at_once():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    client = ResilientClient(breaker=breaker, max_retries=4, base_delay=10)
+
+    start = time.monotonic()
+    with pytest.raises(ModelUnavailable):
+        client.call(lambda: "never sent")
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_no_retry_starts_after_the_deadline():
+    client = ResilientClient(max_retries=4, base_delay=0)
+    calls = []
+
+    def request():
+        calls.append(1)
+        time.sleep(0.05)
+        raise TimeoutError("timed out")
+
+    with pytest.raises(ModelUnavailable):
+        client.call(request, deadline=time.monotonic() + 0.03)
+
+    assert len(calls) == 1